@@ -0,0 +1,4 @@
+#!/bin/bash
+# Allow streaming replication connections for the optional read replica
+set -e
+echo "host replication all all scram-sha-256" >> "$PGDATA/pg_hba.conf"
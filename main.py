@@ -1,10 +1,37 @@
-from fastapi import FastAPI
+import time
+from fastapi import FastAPI, Request
 from src.app.router import router
+from src.metrics import SERVER_TIMING, REQUEST_SECONDS, start_request_timing, server_timing_header
 
 app = FastAPI(title="RAG-PG API")
 app.include_router(router)
 
 
+def _route_label(request: Request) -> str:
+    """Label a request by its matched route template, keeping metric label values bounded."""
+
+    endpoint = request.scope.get("endpoint")
+    for route in app.routes:
+        if getattr(route, "endpoint", None) is endpoint and endpoint is not None:
+            return route.path
+    return "unmatched"
+
+
+@app.middleware("http")
+async def request_timing(request: Request, call_next):
+    """Record request latency, and expose per-stage timings when METRICS_SERVER_TIMING is set."""
+
+    start_request_timing()
+    start = time.perf_counter()
+    response = await call_next(request)
+    elapsed = time.perf_counter() - start
+    REQUEST_SECONDS.observe(elapsed, path=_route_label(request))
+    if SERVER_TIMING:
+        stages = server_timing_header()
+        response.headers["Server-Timing"] = ", ".join(filter(None, [stages, f"total;dur={elapsed * 1000:.1f}"]))
+    return response
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
@@ -1,3 +1,9 @@
+import json
+import base64
+import binascii
+from typing import NamedTuple
+
+
 def unwrap_session(session_or_manager):
     """
     FastAPI injects a _GeneratorContextManager when using @contextmanager.
@@ -7,3 +13,40 @@ def unwrap_session(session_or_manager):
     if hasattr(session_or_manager, "__enter__"):
         return session_or_manager.__enter__()
     return session_or_manager
+
+
+class Cursor(NamedTuple):
+    """Pagination state of a search: keyset position, method, expanded query and embedding slot (column, model)."""
+
+    after: tuple[float, int]
+    method: str
+    query: str
+    slot: tuple | None
+
+
+def encode_cursor(score: float, doc_id: int, method: str, query: str, slot: tuple | None = None) -> str:
+    """
+    Encode the keyset position of a search result into an opaque pagination cursor.
+    The expanded query and embedding slot are carried along, so later pages rank
+    the same query even if the vocabulary refreshes or search is cut over.
+    """
+
+    raw = json.dumps({"after": [score, doc_id], "method": method, "query": query, "slot": slot}).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Cursor:
+    """
+    Decode a pagination cursor back into its keyset position, method, expanded query and slot.
+    Raises ValueError if the cursor is malformed.
+    """
+
+    try:
+        state = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        score, doc_id = state["after"]
+        slot = tuple(state["slot"]) if state["slot"] is not None else None
+        if not isinstance(state["method"], str) or not isinstance(state["query"], str):
+            raise TypeError("method and query must be strings")
+        return Cursor((float(score), int(doc_id)), state["method"], state["query"], slot)
+    except (binascii.Error, UnicodeError, KeyError, TypeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
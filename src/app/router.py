@@ -1,27 +1,75 @@
-from fastapi import APIRouter, UploadFile, File, Form, Depends, HTTPException
+from fastapi import APIRouter, UploadFile, File, Form, Depends, HTTPException, Response
+from fastapi.responses import StreamingResponse, PlainTextResponse, JSONResponse
+from fastapi.concurrency import run_in_threadpool
+import json
 from io import StringIO
 
 import pandas as pd
 from sqlalchemy import text
 from sqlalchemy.orm import Session
 
-from src.db import get_session
-from src.app.helper import unwrap_session
-from src.models.document import Document
-from src.ingestion.embedding import embed_text
-from src.retrieval.search import synonym_vector_search, synonym_fuzzy_search
+from src.db import get_session, get_read_session, mark_write, parse_lsn
+from src.app.helper import unwrap_session, encode_cursor, decode_cursor
+from src.ingestion.store import ingest_documents
+from src.ingestion.indexes import DEFER_INDEXES_MIN_ROWS, drop_search_indexes, build_search_indexes
+from src.metrics import timed, render
+from src.ingestion.versioning import cached_active_slot
+from src.retrieval.search import SearchHit, synonym_expansion, synonym_vector_search, synonym_fuzzy_search, iter_synonym_search
+from src.retrieval.synonyms import SYNONYM_LIST_SIZE
 
 
 router = APIRouter()
 
+# Number of content characters returned when fields="snippet"
+SNIPPET_CHARS = 200
+
+
+def _serialize(hit: SearchHit, fields: str) -> dict:
+    """Shape a search result according to the requested fields."""
+
+    result = hit._asdict()
+    if fields == "title":
+        del result["content"]
+    return result
+
+
+def _pagination_state(session, page, query: str, method: str, threshold: float, max_terms: int | None):
+    """
+    Expand the query on the first page, then reuse it from the cursor while its embedding model still serves search.
+
+    Returns:
+        tuple[str, EmbeddingSlot | None]: Expanded query, and the slot for vector search.
+    """
+
+    slot = cached_active_slot(session) if method == "vector" else None
+    if page is None:
+        return synonym_expansion(session, query, threshold, max_terms), slot
+    if slot is None:
+        return page.query, None
+
+    # Scores from another embedding model are not comparable with the cursor's
+    if len(page.slot) != 2:
+        raise HTTPException(400, "Cursor does not belong to this query")
+    if page.slot != (slot.column, slot.model):
+        raise HTTPException(409, "Search was cut over to another embedding model; restart from the first page")
+    return page.query, slot
+
+
 @router.post("/rag")
 async def rag_endpoint(
+    response: Response,
     session_cm = Depends(get_session),
     file: UploadFile | None = File(None),
     query: str | None = Form(None),
     limit: int = Form(5),
     threshold: float = Form(0.3),
-    method: str = Form("vector")
+    method: str = Form("vector"),
+    cursor: str | None = Form(None),
+    fields: str = Form("full"),
+    stream: bool = Form(False),
+    max_terms: int | None = Form(None),
+    read_primary: bool = Form(False),
+    write_lsn: str | None = Form(None)
 ):
     session: Session = unwrap_session(session_cm)
     ingest_flag = False
@@ -33,10 +81,10 @@ async def rag_endpoint(
         session.commit()
         raw = (await file.read()).decode("utf-8")
         normalized = raw.replace('""', '\\"')
-        stream = StringIO(normalized)
+        csv_stream = StringIO(normalized)
         try:
             chunks = pd.read_csv(
-                stream,
+                csv_stream,
                 chunksize=32,
                 sep=",",
                 quotechar='"',
@@ -46,51 +94,99 @@ async def rag_endpoint(
             )
         except Exception as e:
             raise HTTPException(400, f"CSV parsing error: {e}")
-        for chunk in chunks:
-            required = {"title", "content"}
-            if not required.issubset(chunk.columns):
-                raise HTTPException(400,
-                    "CSV must contain exactly: title, content"
-                )
-            records = []
-            for _, row in chunk.iterrows():
-                title = str(row["title"])
-                content = str(row["content"])
-                embedding = embed_text(content.lower()).tolist()
-                records.append(
-                    Document(title=title, content=content, embedding=embedding)
-                )
-            session.add_all(records)
-            session.commit()
+        # Defer search index maintenance for large uploads only, estimating rows from line count
+        defer_indexes = raw.count("\n") >= DEFER_INDEXES_MIN_ROWS
+        if defer_indexes:
+            drop_search_indexes(session)
+        try:
+            for chunk in chunks:
+                required = {"title", "content"}
+                if not required.issubset(chunk.columns):
+                    raise HTTPException(400,
+                        "CSV must contain exactly: title, content"
+                    )
+                titles = [str(title) for title in chunk["title"]]
+                contents = [str(content) for content in chunk["content"]]
+                with timed("ingest"):
+                    ingest_documents(session, titles, contents)
+        finally:
+            # Rebuild off the event loop, so other requests keep being served
+            if defer_indexes:
+                session.rollback()
+                await run_in_threadpool(build_search_indexes, session)
+        # Hand the write position to the client, so any worker can serve its next reads consistently
+        response.headers["X-Write-LSN"] = mark_write(session)
         ingest_flag = True
 
     if query is not None:
-        if method == "vector":
-            results = synonym_vector_search(session, query, limit=limit)
-            return [
-                {
-                    "id": doc.id,
-                    "title": doc.title,
-                    "content": doc.content,
-                    "score": score
-                }
-                for doc, score in results
-            ]
-        elif method == "fuzzy":
-            results = synonym_fuzzy_search(session, query, limit=limit, threshold=threshold)
-            return [
-                {
-                    "id": doc.id,
-                    "title": doc.title,
-                    "content": doc.content,
-                    "score": score,
-                }
-                for doc, score in results
-            ]
-        else:
+        if method not in ("vector", "fuzzy"):
             raise HTTPException(400, "method must be 'vector' or 'fuzzy'")
+        if fields not in ("full", "snippet", "title"):
+            raise HTTPException(400, "fields must be 'full', 'snippet' or 'title'")
+        if max_terms is not None and not 0 <= max_terms <= SYNONYM_LIST_SIZE:
+            raise HTTPException(400, f"max_terms must be between 0 and {SYNONYM_LIST_SIZE}")
+        try:
+            page = decode_cursor(cursor) if cursor is not None else None
+            if write_lsn is not None:
+                parse_lsn(write_lsn)
+        except ValueError as e:
+            raise HTTPException(400, str(e))
+        if page is not None and (
+            page.method != method or not page.query.startswith(query) or (page.slot is None) != (method == "fuzzy")
+        ):
+            raise HTTPException(400, "Cursor does not belong to this query")
+        after = page.after if page is not None else None
+        snippet = {"full": None, "snippet": SNIPPET_CHARS, "title": 0}[fields]
+
+        # Read from a replica that replayed the client's last write, unless this request just ingested or asked for the primary
+        primary = read_primary or ingest_flag
+
+        # Stream NDJSON lines page by page, without materializing the full result set
+        if stream:
+            with get_read_session(primary=primary, min_lsn=write_lsn) as read_session:
+                query_expanded, slot = _pagination_state(read_session, page, query, method, threshold, max_terms)
+
+            def lines():
+                with get_read_session(primary=primary, min_lsn=write_lsn) as read_session:
+                    results = iter_synonym_search(
+                        read_session, query, method=method, limit=limit, threshold=threshold,
+                        after=after, snippet=snippet, query_expanded=query_expanded, slot=slot
+                    )
+                    for hit in results:
+                        yield json.dumps(_serialize(hit, fields)) + "\n"
+            return StreamingResponse(lines(), media_type="application/x-ndjson", headers=dict(response.headers))
+
+        with get_read_session(primary=primary, min_lsn=write_lsn) as read_session:
+            query_expanded, slot = _pagination_state(read_session, page, query, method, threshold, max_terms)
+            if method == "vector":
+                results = synonym_vector_search(
+                    read_session, query, limit=limit, after=after, snippet=snippet,
+                    query_expanded=query_expanded, slot=slot
+                )
+            else:
+                results = synonym_fuzzy_search(
+                    read_session, query, limit=limit, threshold=threshold, after=after, snippet=snippet,
+                    query_expanded=query_expanded
+                )
+
+        # A full page means more results may follow; later pages reuse this page's query and slot
+        if results and len(results) == limit:
+            response.headers["X-Next-Cursor"] = encode_cursor(
+                results[-1].score, results[-1].id, method, query_expanded,
+                (slot.column, slot.model) if slot is not None else None
+            )
+        # Render the JSON body here, so the stage covers encoding and not only dict building
+        with timed("serialize"):
+            return JSONResponse([_serialize(hit, fields) for hit in results], headers=dict(response.headers))
 
     if ingest_flag:
         return {"message": "File ingested."}
 
     raise HTTPException(400, "Provide a CSV file or a query")
+
+
+@router.get("/metrics")
+def metrics_endpoint():
+    """Expose hot-path metrics in Prometheus text format."""
+
+    return PlainTextResponse(render(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,56 @@
+import timeit
+from collections import namedtuple
+from src.retrieval.search import SearchHit
+
+
+# Stand-in for the SQLAlchemy rows returned by the search queries
+Row = namedtuple("Row", ["id", "title", "content", "score"])
+
+
+def _rows(n: int) -> list[Row]:
+    """Create n synthetic result rows with realistic field sizes."""
+
+    return [Row(i, f"Title {i}", "lorem ipsum " * 40, 1.0 / (i + 1)) for i in range(n)]
+
+
+def _via_documents(rows: list[Row]) -> list[dict]:
+    """Legacy path: transient ORM Document per row, then a dict per Document."""
+
+    from src.models.document import Document
+
+    results = [(Document(id=r.id, title=r.title, content=r.content), float(r.score)) for r in rows]
+    return [
+        {"id": doc.id, "title": doc.title, "content": doc.content, "score": score}
+        for doc, score in results
+    ]
+
+
+def _via_hits(rows: list[Row]) -> list[dict]:
+    """Current path: SearchHit per row, then a dict per hit."""
+
+    results = [SearchHit(r.id, r.title, r.content, float(r.score)) for r in rows]
+    return [hit._asdict() for hit in results]
+
+
+def benchmark_hits(limits: tuple[int, ...] = (10, 1_000, 10_000, 100_000), repeat: int = 5) -> None:
+    """
+    Compare per-hit overhead of ORM Document results against SearchHit results.
+
+    Args:
+        limits (tuple[int, ...], optional):
+            Result set sizes to measure (default: 10, 1k, 10k, 100k).
+        repeat (int, optional):
+            Number of timing repetitions, the best one is reported (default: 5).
+    """
+
+    print(f"{'limit':>8} {'document µs/hit':>16} {'hit µs/hit':>11} {'speedup':>8}")
+    for n in limits:
+        rows = _rows(n)
+        number = max(1, 10_000 // n)
+        legacy = min(timeit.repeat(lambda: _via_documents(rows), number=number, repeat=repeat)) / number
+        current = min(timeit.repeat(lambda: _via_hits(rows), number=number, repeat=repeat)) / number
+        print(f"{n:>8} {legacy / n * 1e6:>16.3f} {current / n * 1e6:>11.3f} {legacy / current:>7.1f}x")
+
+
+if __name__ == "__main__":
+    benchmark_hits()
@@ -0,0 +1,411 @@
+import json
+import time
+import argparse
+import datetime
+import platform
+import subprocess
+import numpy as np
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from src.db import DATABASE_URL
+from src.ingestion.embedding import embed_text
+from src.ingestion.store import ingest_documents
+from src.ingestion.versioning import get_active_slot, cached_active_slot
+from src.retrieval.synonyms import get_vocabulary
+from src.retrieval.search import (
+    SearchHit,
+    get_nlp,
+    vector_search,
+    fuzzy_search,
+    synonym_vector_search,
+    synonym_fuzzy_search,
+)
+
+
+# Candidate list size of the approximate HNSW path
+HNSW_EF_SEARCH = 40
+
+
+def _hnsw_query(column: str) -> str:
+    """Nearest-neighbour query ordered by raw distance, so the planner can use the HNSW index."""
+
+    return f"""
+        SELECT id, title, content, 1 - ({column} <-> CAST(:q AS vector)) AS score
+        FROM documents
+        ORDER BY {column} <-> CAST(:q AS vector)
+        LIMIT :limit
+    """
+
+
+def hnsw_vector_search(session, query: str, limit: int, ef_search: int = HNSW_EF_SEARCH) -> list[SearchHit]:
+    """
+    Approximate vector search through the HNSW index.
+
+    vector_search orders by its computed score and is therefore always exact; this
+    path is what recall@k is measured on.
+
+    Args:
+        session (sqlalchemy.orm.Session):
+            Active SQLAlchemy session bound to PostgreSQL.
+        query (str):
+            Text query to search.
+        limit (int):
+            Maximum number of results to return.
+        ef_search (int, optional):
+            HNSW candidate list size (default: HNSW_EF_SEARCH, 40).
+
+    Returns:
+        list[SearchHit]: Approximate nearest documents with their similarity score.
+    """
+
+    slot = cached_active_slot(session)
+    session.execute(text("SELECT set_config('hnsw.ef_search', :v, true)"), {"v": str(int(ef_search))})
+    rows = session.execute(text(_hnsw_query(slot.column)), {
+        "q": embed_text(query.lower(), model_name=slot.model).tolist(), "limit": limit
+    }).fetchall()
+    session.rollback()
+    return [SearchHit(r.id, r.title, r.content, float(r.score)) for r in rows]
+
+
+def _hnsw_uses_index(Session, query: str, limit: int) -> bool:
+    """Check the plan of the HNSW path, so results show whether the index was actually used."""
+
+    with Session() as session:
+        slot = cached_active_slot(session)
+        plan = session.execute(text(f"EXPLAIN {_hnsw_query(slot.column)}"), {
+            "q": embed_text(query.lower(), model_name=slot.model).tolist(), "limit": limit
+        }).fetchall()
+    return any("hnsw" in r[0] for r in plan)
+
+
+# Search methods under benchmark, keyed by the name used in results
+METHODS = {
+    "vector": lambda session, q, limit: vector_search(session, q, limit=limit),
+    "vector_hnsw": lambda session, q, limit: hnsw_vector_search(session, q, limit),
+    "fuzzy": lambda session, q, limit: fuzzy_search(session, q, limit=limit),
+    "synonym_vector": lambda session, q, limit: synonym_vector_search(session, q, limit=limit),
+    "synonym_fuzzy": lambda session, q, limit: synonym_fuzzy_search(session, q, limit=limit),
+}
+
+
+def synthesize_corpus(source: str, rows: int, seed: int = 123):
+    """
+    Synthesize a corpus of arbitrary size from a small title/content CSV.
+
+    Each synthetic row joins two to five sentences sampled from the whole source,
+    in random order, so documents stay realistic in length and vocabulary. A small
+    source only holds a few hundred sentences, so contents are drawn again until
+    unseen: identical contents embed identically and would turn the top-k into ties.
+
+    Args:
+        source (str):
+            Path to a CSV with title and content columns (e.g. AGNews-100.csv).
+        rows (int):
+            Number of documents to generate.
+        seed (int, optional):
+            Random seed for reproducibility (default: 123).
+
+    Yields:
+        tuple[str, str]: Title and content of each synthetic document.
+    """
+
+    df = pd.read_csv(source, skipinitialspace=True)
+    titles = df["title"].astype(str).tolist()
+    pool = [(row, s.strip().rstrip(".")) for row, c in enumerate(df["content"]) for s in str(c).split(". ") if s.strip(" .")]
+    rng = np.random.default_rng(seed)
+
+    seen = set()
+    for i in range(rows):
+        # Draw sentences until the combination is new, titled after the row of the first one
+        while True:
+            picks = rng.choice(len(pool), size=rng.integers(2, 6), replace=False)
+            content = ". ".join(pool[p][1] for p in picks) + "."
+            if content not in seen:
+                break
+        seen.add(content)
+        yield f"{titles[pool[picks[0]][0]]} #{i}", content
+
+
+def ingest_corpus(Session, corpus, batch_size: int = 256) -> dict:
+    """
+    Replace the documents table with a synthetic corpus, measuring throughput.
+
+    Args:
+        Session (sqlalchemy.orm.sessionmaker):
+            Session factory bound to the benchmark engine.
+        corpus (Iterable[tuple[str, str]]):
+            Title and content pairs to ingest.
+        batch_size (int, optional):
+            Rows embedded and inserted per round trip (default: 256).
+
+    Returns:
+        dict: Row count, elapsed seconds and rows per second.
+    """
+
+    with Session() as session:
+        session.execute(text("TRUNCATE TABLE documents RESTART IDENTITY CASCADE;"))
+        session.commit()
+
+        start = time.perf_counter()
+        total = 0
+        batch = []
+        for title, content in corpus:
+            batch.append((title, content))
+            if len(batch) == batch_size:
+                total += ingest_documents(session, *zip(*batch))
+                batch = []
+        if batch:
+            total += ingest_documents(session, *zip(*batch))
+        elapsed = time.perf_counter() - start
+
+    return {"rows": total, "seconds": elapsed, "rows_per_second": total / elapsed if elapsed else None}
+
+
+def _recall(session, query: str, ids: list[int], limit: int) -> float | None:
+    """
+    Recall@k of returned ids against the exact top-k by sequential scan.
+
+    A returned document counts as correct when it is no farther from the query than
+    the k-th exact neighbour, so any of several equidistant documents tied at the
+    boundary is accepted rather than only the one with the lowest id.
+    """
+
+    slot = get_active_slot(session)
+    params = {"q": embed_text(query.lower(), model_name=slot.model).tolist(), "limit": limit}
+    session.execute(text("SET LOCAL enable_indexscan = off"))
+    exact = session.execute(text(f"""
+        SELECT {slot.column} <-> CAST(:q AS vector) AS distance
+        FROM documents
+        WHERE 1 - ({slot.column} <-> CAST(:q AS vector)) > 0
+        ORDER BY distance ASC
+        LIMIT :limit
+    """), params).scalars().all()
+    if not exact:
+        session.rollback()
+        return None
+    correct = session.execute(text(f"""
+        SELECT COUNT(*)
+        FROM documents
+        WHERE id = ANY(:ids) AND {slot.column} <-> CAST(:q AS vector) <= :kth
+    """), {**params, "ids": ids, "kth": exact[-1]}).scalar()
+    session.rollback()
+    return min(correct, len(exact)) / len(exact)
+
+
+def measure_latency(Session, method: str, queries: list[str], limit: int, concurrency: int) -> dict:
+    """
+    Run every query once against a search method with a fixed number of workers.
+
+    Args:
+        Session (sqlalchemy.orm.sessionmaker):
+            Session factory bound to the benchmark engine.
+        method (str):
+            Key in METHODS.
+        queries (list[str]):
+            Query texts to run.
+        limit (int):
+            Maximum number of results per query.
+        concurrency (int):
+            Number of concurrent workers, each holding its own session.
+
+    Returns:
+        dict: Latency percentiles in milliseconds, QPS and the results of each query.
+    """
+
+    search = METHODS[method]
+    chunks = [queries[i::concurrency] for i in range(concurrency)]
+
+    def worker(chunk):
+        timings = []
+        with Session() as session:
+            for q in chunk:
+                start = time.perf_counter()
+                hits = search(session, q, limit)
+                timings.append((q, time.perf_counter() - start, [hit.id for hit in hits]))
+        return timings
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        timings = [t for chunk in pool.map(worker, chunks) for t in chunk]
+    wall = time.perf_counter() - start
+
+    latencies = np.array([t for _, t, _ in timings]) * 1000
+    return {
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+        "mean_ms": float(latencies.mean()),
+        "qps": len(timings) / wall,
+        "results": {q: ids for q, _, ids in timings},
+    }
+
+
+def measure_recall(Session, method: str, results: dict[str, list[int]], limit: int) -> float | None:
+    """
+    Compute mean recall@k of the approximate HNSW path against exact search.
+
+    The other methods, including vector_search and the in-process index, rank
+    exactly, so their recall would be 1.0 by construction and is not reported.
+
+    Args:
+        Session (sqlalchemy.orm.sessionmaker):
+            Session factory bound to the benchmark engine.
+        method (str):
+            Key in METHODS; only 'vector_hnsw' is approximate, others return None.
+        results (dict[str, list[int]]):
+            Ids returned per query by the method under test.
+        limit (int):
+            The k in recall@k.
+
+    Returns:
+        float | None: Mean recall@k across queries.
+    """
+
+    if method != "vector_hnsw":
+        return None
+
+    recalls = []
+    with Session() as session:
+        for q, ids in results.items():
+            recall = _recall(session, q, ids, limit)
+            if recall is not None:
+                recalls.append(recall)
+    return float(np.mean(recalls)) if recalls else None
+
+
+def _git_commit() -> str | None:
+    """Current commit hash, so results can be compared across commits."""
+
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmark(
+    source: str = "src/data/AGNews-100.csv",
+    rows: int = 10_000,
+    queries: int = 100,
+    limit: int = 10,
+    concurrency: tuple[int, ...] = (1, 4, 16),
+    methods: tuple[str, ...] = tuple(METHODS),
+    skip_ingest: bool = False,
+    seed: int = 123,
+    output: str = "bench_output.json"
+) -> dict:
+    """
+    Run the retrieval benchmark and write results as JSON.
+
+    WARNING: unless skip_ingest is set, the documents table is truncated and
+    replaced with the synthetic corpus.
+
+    Args:
+        source (str, optional):
+            CSV used to synthesize the corpus and sample queries (default: AGNews-100.csv).
+        rows (int, optional):
+            Corpus size (default: 10,000).
+        queries (int, optional):
+            Number of queries per method and concurrency level (default: 100).
+        limit (int, optional):
+            Results per query, and the k in recall@k (default: 10).
+        concurrency (tuple[int, ...], optional):
+            Concurrency levels to measure (default: 1, 4, 16).
+        methods (tuple[str, ...], optional):
+            Search methods to measure (default: all).
+        skip_ingest (bool, optional):
+            Reuse the current corpus instead of ingesting a new one (default: False).
+        seed (int, optional):
+            Random seed for reproducibility (default: 123).
+        output (str, optional):
+            Path of the JSON results file (default: bench_output.json).
+
+    Returns:
+        dict: The benchmark results.
+    """
+
+    unknown = set(methods) - set(METHODS)
+    if unknown:
+        raise ValueError(f"Unknown search methods: {', '.join(sorted(unknown))}")
+
+    # Size the pool so every worker holds its own connection
+    engine = create_engine(DATABASE_URL, pool_size=max(concurrency), max_overflow=0)
+    Session = sessionmaker(bind=engine, autoflush=False, future=True)
+
+    results = {
+        "commit": _git_commit(),
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "config": {
+            "source": source, "rows": rows, "queries": queries, "limit": limit,
+            "concurrency": list(concurrency), "methods": list(methods), "seed": seed,
+        },
+        "ingestion": None,
+        "hnsw_index_used": None,
+        "notes": "recall_at_k is measured on vector_hnsw only; the other methods rank exactly.",
+        "search": [],
+    }
+
+    # Ingest synthetic corpus
+    if not skip_ingest:
+        results["ingestion"] = ingest_corpus(Session, synthesize_corpus(source, rows, seed))
+        print(f"Ingested {results['ingestion']['rows']} rows at {results['ingestion']['rows_per_second']:.1f} rows/s")
+
+    # Sample queries from source titles
+    titles = pd.read_csv(source, skipinitialspace=True)["title"].astype(str)
+    query_set = titles.sample(n=queries, replace=queries > len(titles), random_state=seed).tolist()
+
+    # Warm up models, the synonym vocabulary and caches so one-time loads are not attributed to the first queries
+    with Session() as session:
+        if any(method.startswith("synonym") for method in methods):
+            get_vocabulary(session, get_nlp(), wait=True)
+        for method in methods:
+            METHODS[method](session, query_set[0], limit)
+    if "vector_hnsw" in methods:
+        results["hnsw_index_used"] = _hnsw_uses_index(Session, query_set[0], limit)
+        print(f"HNSW index used by vector_hnsw: {results['hnsw_index_used']}")
+
+    # Measure each method at each concurrency level
+    for method in methods:
+        for c in concurrency:
+            stats = measure_latency(Session, method, query_set, limit, c)
+            ids = stats.pop("results")
+            stats["recall_at_k"] = measure_recall(Session, method, ids, limit) if c == concurrency[0] else None
+            results["search"].append({"method": method, "concurrency": c, **stats})
+            print(f"{method:>15} c={c:<3} p50={stats['p50_ms']:.1f}ms p95={stats['p95_ms']:.1f}ms "
+                  f"p99={stats['p99_ms']:.1f}ms qps={stats['qps']:.1f} recall@{limit}={stats['recall_at_k']}")
+
+    # Write results
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"Wrote benchmark results to '{output}'")
+    engine.dispose()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="RAG-PG retrieval benchmark (truncates the documents table unless --skip-ingest).")
+    parser.add_argument("--source", default="src/data/AGNews-100.csv")
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--concurrency", default="1,4,16", help="Comma-separated concurrency levels.")
+    parser.add_argument("--methods", default=",".join(METHODS), help="Comma-separated search methods.")
+    parser.add_argument("--skip-ingest", action="store_true")
+    parser.add_argument("--seed", type=int, default=123)
+    parser.add_argument("--output", default="bench_output.json")
+    args = parser.parse_args()
+
+    run_benchmark(
+        source=args.source,
+        rows=args.rows,
+        queries=args.queries,
+        limit=args.limit,
+        concurrency=tuple(int(c) for c in args.concurrency.split(",")),
+        methods=tuple(args.methods.split(",")),
+        skip_ingest=args.skip_ingest,
+        seed=args.seed,
+        output=args.output,
+    )
@@ -4,21 +4,169 @@ from dotenv import load_dotenv
 load_dotenv()
 
 # Core imports
-from sqlalchemy import create_engine
+import re
+import time
+import threading
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import SQLAlchemyError, OperationalError
 from sqlalchemy.orm import sessionmaker
 from contextlib import contextmanager
+from src.metrics import DB_SESSIONS
 
 # Retrieve database URL
 DATABASE_URL = os.getenv("DATABASE_URL")
 if not DATABASE_URL:
     raise RuntimeError("DATABASE_URL environment variable is required for ORM Session.")
 
+# Retrieve optional comma-separated read replica URLs, routing reads to the primary when unset
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+
+# Replica health check interval, connection timeout and tolerated replication lag (disabled when unset)
+REPLICA_HEALTH_SECONDS = float(os.getenv("REPLICA_HEALTH_SECONDS", "5"))
+REPLICA_CONNECT_TIMEOUT = int(os.getenv("REPLICA_CONNECT_TIMEOUT", "2"))
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS")) if os.getenv("REPLICA_MAX_LAG_SECONDS") else None
+
 # Create SQLAlchemy engine
 engine = create_engine(DATABASE_URL, future=True, echo=False)
 
 # Set the ORM session factory
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
 
+# WAL position of the last write committed by this process, for read-your-writes
+_LAST_WRITE_LSN = "0/0"
+
+# Replica checkout check: connects, and tells whether the replica replayed a WAL position.
+# A server that is not in recovery (e.g. the primary as local stand-in) is always caught up.
+_REPLAYED_SQL = text("SELECT COALESCE(pg_last_wal_replay_lsn() >= CAST(:lsn AS pg_lsn), true)")
+
+
+class ReplicaPool:
+    """
+    Round-robin pool of read replica engines, skipping replicas that fail health checks.
+
+    Each replica is checked at most every REPLICA_HEALTH_SECONDS, when it is next
+    in line, or immediately after a failed connection. A check connects within
+    REPLICA_CONNECT_TIMEOUT, and when REPLICA_MAX_LAG_SECONDS is set also compares
+    the time since the last replayed transaction against it. That lag grows while the
+    primary is idle too, so only enable it with a steady write load.
+    """
+
+    def __init__(self, urls: list[str]):
+        self.urls = urls
+        self.engines = [
+            create_engine(
+                url, future=True, echo=False, pool_pre_ping=True,
+                connect_args={"connect_timeout": REPLICA_CONNECT_TIMEOUT}
+            )
+            for url in urls
+        ]
+        self._healthy = [True] * len(urls)
+        self._checked_at = [float("-inf")] * len(urls)
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.engines)
+
+    def check(self, i: int) -> bool:
+        """
+        Run a health check on one replica and record the outcome.
+
+        Args:
+            i (int):
+                Replica position in DATABASE_REPLICA_URLS.
+
+        Returns:
+            bool: True if the replica is reachable and within the tolerated lag.
+        """
+
+        try:
+            with self.engines[i].connect() as conn:
+                lag = conn.execute(text(
+                    "SELECT COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)"
+                )).scalar()
+            healthy = REPLICA_MAX_LAG_SECONDS is None or float(lag) <= REPLICA_MAX_LAG_SECONDS
+        except SQLAlchemyError:
+            healthy = False
+        self._healthy[i] = healthy
+        return healthy
+
+    def choose(self) -> tuple[int, object] | None:
+        """
+        Pick the next healthy replica in round-robin order.
+
+        Returns:
+            tuple[int, sqlalchemy.engine.Engine] | None: Replica position and engine, or None if none is healthy.
+        """
+
+        for _ in range(len(self)):
+            # Advance the round-robin position
+            with self._lock:
+                i = self._next
+                self._next = (i + 1) % len(self)
+                due = time.monotonic() - self._checked_at[i] >= REPLICA_HEALTH_SECONDS
+                if due:
+                    self._checked_at[i] = time.monotonic()
+
+            # Re-check replicas whose last check expired, outside the lock
+            if (self.check(i) if due else self._healthy[i]):
+                return i, self.engines[i]
+        return None
+
+    def mark_unhealthy(self, i: int) -> None:
+        """
+        Skip a replica until its next health check, e.g. after a failed connection.
+
+        Args:
+            i (int):
+                Replica position in DATABASE_REPLICA_URLS.
+        """
+
+        with self._lock:
+            self._healthy[i] = False
+            self._checked_at[i] = time.monotonic()
+
+
+# Initialize replica pool, None without replicas
+replicas = ReplicaPool(DATABASE_REPLICA_URLS) if DATABASE_REPLICA_URLS else None
+
+
+def parse_lsn(lsn: str) -> int:
+    """
+    Convert a PostgreSQL WAL position such as '0/16B3748' into a comparable integer.
+    Raises ValueError if the position is malformed.
+    """
+
+    # Accept only the form PostgreSQL itself casts to pg_lsn, unlike int() which also takes e.g. '0x1' or ' 1_0'
+    if not isinstance(lsn, str) or not re.fullmatch(r"[0-9A-Fa-f]{1,8}/[0-9A-Fa-f]{1,8}", lsn):
+        raise ValueError(f"Invalid WAL position: {lsn}")
+    high, low = lsn.split("/")
+    return int(high, 16) << 32 | int(low, 16)
+
+
+def mark_write(session) -> str:
+    """
+    Record the primary's WAL position after a committed write, so later reads only use replicas that replayed it.
+
+    The position is only remembered by this process; return it to clients so
+    requests served by other workers can require it too (see get_read_session).
+
+    Args:
+        session (sqlalchemy.orm.Session):
+            Session bound to the primary that committed the write.
+
+    Returns:
+        str: WAL position of the write, e.g. '0/16B3748'.
+    """
+
+    global _LAST_WRITE_LSN
+    lsn = session.execute(text("SELECT pg_current_wal_lsn()::text")).scalar()
+    session.rollback()
+    if parse_lsn(lsn) > parse_lsn(_LAST_WRITE_LSN):
+        _LAST_WRITE_LSN = lsn
+    return lsn
+
+
 # Dependency utility for application/services
 @contextmanager
 def get_session():
@@ -28,3 +176,57 @@ def get_session():
         yield db
     finally:
         db.close()
+
+
+@contextmanager
+def get_read_session(primary: bool = False, min_lsn: str | None = None):
+    """
+    Context managed read-only session, routed to a healthy replica when configured.
+
+    A replica is only used once it replayed the last write of this process, and
+    min_lsn when given, so reads observe them. A replica that fails to connect is
+    marked unhealthy and the next one is tried. Falls back to the primary without
+    replicas, when no replica is healthy and caught up, or when primary=True.
+
+    Args:
+        primary (bool, optional):
+            Force the primary, e.g. to read rows written earlier in the same request (default: False).
+        min_lsn (str, optional):
+            WAL position a replica must have replayed, e.g. returned by mark_write to
+            a client whose next request may reach another process (default: None).
+    """
+
+    # Require the latest of this process's last write and the caller's position
+    lsn = _LAST_WRITE_LSN
+    if min_lsn is not None and parse_lsn(min_lsn) > parse_lsn(lsn):
+        lsn = min_lsn
+
+    # Try replicas in round-robin order, checking each at checkout
+    db = None
+    tried = set()
+    while replicas is not None and not primary and len(tried) < len(replicas):
+        chosen = replicas.choose()
+        if chosen is None or chosen[0] in tried:
+            break
+        i, replica_engine = chosen
+        tried.add(i)
+        db = SessionLocal(bind=replica_engine)
+        try:
+            caught_up = db.execute(_REPLAYED_SQL, {"lsn": lsn}).scalar()
+        except OperationalError:
+            replicas.mark_unhealthy(i)
+            caught_up = False
+        if caught_up:
+            DB_SESSIONS.inc(target=f"replica-{i}")
+            break
+        db.close()
+        db = None
+
+    # Fall back to the primary
+    if db is None:
+        DB_SESSIONS.inc(target="primary")
+        db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
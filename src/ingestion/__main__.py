@@ -0,0 +1,60 @@
+import os
+import argparse
+from src.ingestion.bulk import bulk_ingest, read_checkpoint, read_committed
+
+
+def main() -> None:
+    """Command-line entry point for offline bulk ingestion: python -m src.ingestion."""
+
+    parser = argparse.ArgumentParser(
+        prog="python -m src.ingestion",
+        description="Ingest CSV, Parquet, JSONL or a cached Hugging Face dataset (hf://<name>) into PostgreSQL.",
+    )
+    parser.add_argument("source", help="Path to a .csv, .parquet or .jsonl file, or hf://<dataset name>.")
+    parser.add_argument("--batch-size", type=int, default=256, help="Rows embedded and inserted per transaction.")
+    parser.add_argument("--workers", type=int, default=2, help="Concurrent embed-and-insert workers.")
+    parser.add_argument("--offset", type=int, default=0, help="Number of leading source rows to skip.")
+    parser.add_argument("--checkpoint", help="Checkpoint file recording committed rows.")
+    parser.add_argument("--resume", action="store_true", help="Resume from --checkpoint, skipping every committed batch.")
+    parser.add_argument("--truncate", action="store_true", help="Empty the documents table first.")
+    parser.add_argument("--defer-indexes", action="store_true", help="Rebuild search indexes in bulk after loading.")
+    parser.add_argument("--title-column", default="title")
+    parser.add_argument("--content-column", default="content")
+    parser.add_argument("--split", default="train", help="Dataset split for hf:// sources.")
+    parser.add_argument("--allow-download", action="store_true", help="Download hf:// datasets missing from the local cache.")
+    args = parser.parse_args()
+
+    # Keep hf:// sources on the local datasets cache; read when datasets is first imported
+    if not args.allow_download:
+        os.environ.setdefault("HF_DATASETS_OFFLINE", "1")
+
+    if args.resume and not args.checkpoint:
+        parser.error("--resume requires --checkpoint")
+    if args.resume and args.truncate:
+        parser.error("--resume cannot be combined with --truncate")
+    offset = read_checkpoint(args.checkpoint, args.source) if args.resume else args.offset
+    committed = read_committed(args.checkpoint, args.source) if args.resume else None
+
+    def report(total: int, prefix: int, elapsed: float) -> None:
+        print(f"Ingested {total} rows (offset {prefix}, {total / elapsed:.1f} rows/s)")
+
+    total = bulk_ingest(
+        args.source,
+        batch_size=args.batch_size,
+        workers=args.workers,
+        offset=offset,
+        checkpoint=args.checkpoint,
+        truncate=args.truncate,
+        defer_indexes=args.defer_indexes,
+        committed=committed,
+        progress=report,
+        index_progress=True,
+        title_column=args.title_column,
+        content_column=args.content_column,
+        split=args.split,
+    )
+    print(f"Ingested {total} rows from '{args.source}'")
+
+
+if __name__ == "__main__":
+    main()
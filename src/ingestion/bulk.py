@@ -0,0 +1,284 @@
+import os
+import json
+import time
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+import pandas as pd
+from sqlalchemy import text
+
+from src.db import get_session
+from src.ingestion.store import ingest_documents
+from src.ingestion.indexes import deferred_indexes
+
+
+def _rows_from_frames(frames, title_column: str, content_column: str):
+    """Yield (title, content) rows from an iterable of DataFrame chunks."""
+
+    for frame in frames:
+        titles = frame[title_column].tolist() if title_column in frame.columns else [None] * len(frame)
+        for title, content in zip(titles, frame[content_column].tolist()):
+            yield (None if title is None or pd.isna(title) else str(title)), str(content)
+
+
+def read_rows(
+    source: str,
+    offset: int = 0,
+    title_column: str = "title",
+    content_column: str = "content",
+    split: str = "train",
+    chunk_size: int = 10_000
+):
+    """
+    Stream (title, content) rows from a local file or a Hugging Face dataset.
+
+    Supported sources are CSV, Parquet and JSONL files (by extension), and
+    'hf://<dataset name>' for Hugging Face datasets. Datasets are reused from the
+    local datasets cache when present, otherwise downloaded, unless offline mode
+    is enabled with HF_DATASETS_OFFLINE=1 before datasets is first imported, in
+    which case uncached datasets fail to load.
+
+    Args:
+        source (str):
+            Path to a .csv, .parquet, .jsonl/.ndjson file, or 'hf://<dataset name>'.
+        offset (int, optional):
+            Number of leading rows to skip, for resuming (default: 0).
+        title_column (str, optional):
+            Column holding titles, filled with None when absent (default: 'title').
+        content_column (str, optional):
+            Column holding contents (default: 'content').
+        split (str, optional):
+            Dataset split for Hugging Face sources (default: 'train').
+        chunk_size (int, optional):
+            Rows read from disk at a time (default: 10,000).
+
+    Yields:
+        tuple[str | None, str]: Title and content of each row.
+    """
+
+    ext = os.path.splitext(source)[1].lower()
+
+    if source.startswith("hf://"):
+        # Read from the local datasets cache when present, starting at the offset
+        from datasets import load_dataset
+        ds = load_dataset(source[len("hf://"):], split=split, download_mode="reuse_cache_if_exists")
+        ds = ds.select(range(min(offset, len(ds)), len(ds)))
+        frames = (pd.DataFrame(batch) for batch in ds.iter(batch_size=chunk_size))
+        yield from _rows_from_frames(frames, title_column, content_column)
+
+    elif ext == ".csv":
+        # Skip data rows (keeping the header) without parsing them
+        frames = pd.read_csv(
+            source,
+            chunksize=chunk_size,
+            skiprows=range(1, offset + 1),
+            skipinitialspace=True,
+        )
+        yield from _rows_from_frames(frames, title_column, content_column)
+
+    elif ext == ".parquet":
+        import pyarrow.parquet as pq
+        frames = (b.to_pandas() for b in pq.ParquetFile(source).iter_batches(batch_size=chunk_size))
+        yield from islice(_rows_from_frames(frames, title_column, content_column), offset, None)
+
+    elif ext in (".jsonl", ".ndjson"):
+        frames = pd.read_json(source, lines=True, chunksize=chunk_size)
+        yield from islice(_rows_from_frames(frames, title_column, content_column), offset, None)
+
+    else:
+        raise ValueError(f"Unsupported source: {source} (expected .csv, .parquet, .jsonl or hf://<dataset>)")
+
+
+def _batched(rows, batch_size: int, offset: int, committed: dict[int, int] | None = None):
+    """Group rows into contiguous batches tagged with the source offset of their first row, skipping committed ranges."""
+
+    ranges = sorted((start, start + size) for start, size in (committed or {}).items() if start + size > offset)
+    batch, start, position, i = [], offset, offset, 0
+    for row in rows:
+        # Skip rows inside a range committed by an earlier run
+        while i < len(ranges) and ranges[i][1] <= position:
+            i += 1
+        if i < len(ranges) and ranges[i][0] <= position:
+            if batch:
+                yield start, batch
+                batch = []
+            position += 1
+            continue
+
+        if not batch:
+            start = position
+        batch.append(row)
+        position += 1
+        if len(batch) == batch_size:
+            yield start, batch
+            batch = []
+    if batch:
+        yield start, batch
+
+
+def _ingest_batch(batch: list[tuple[str | None, str]]) -> int:
+    """Embed and insert one batch in its own session."""
+
+    with get_session() as session:
+        return ingest_documents(session, [t for t, _ in batch], [c for _, c in batch])
+
+
+def _write_checkpoint(path: str, source: str, offset: int, committed: dict[int, int]) -> None:
+    """Atomically record the committed source prefix, and committed batches beyond it."""
+
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"source": source, "offset": offset, "committed": sorted(committed.items())}, f)
+    os.replace(tmp, path)
+
+
+def read_checkpoint(path: str, source: str) -> int:
+    """
+    Read the resume offset from a checkpoint file.
+
+    Args:
+        path (str):
+            Checkpoint file path.
+        source (str):
+            Source the checkpoint must belong to.
+
+    Returns:
+        int: Number of source rows already committed, 0 without a matching checkpoint.
+    """
+
+    if not os.path.exists(path):
+        return 0
+    with open(path, "r", encoding="utf-8") as f:
+        checkpoint = json.load(f)
+    return checkpoint["offset"] if checkpoint.get("source") == source else 0
+
+
+def read_committed(path: str, source: str) -> dict[int, int]:
+    """
+    Read the batches committed beyond the checkpointed prefix, e.g. before a failure.
+
+    Args:
+        path (str):
+            Checkpoint file path.
+        source (str):
+            Source the checkpoint must belong to.
+
+    Returns:
+        dict[int, int]: Source offset and row count of each committed batch, empty without a matching checkpoint.
+    """
+
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        checkpoint = json.load(f)
+    if checkpoint.get("source") != source:
+        return {}
+    return {int(start): int(size) for start, size in checkpoint.get("committed", [])}
+
+
+def bulk_ingest(
+    source: str,
+    batch_size: int = 256,
+    workers: int = 2,
+    offset: int = 0,
+    checkpoint: str | None = None,
+    truncate: bool = False,
+    defer_indexes: bool = False,
+    committed: dict[int, int] | None = None,
+    progress=None,
+    index_progress: bool = False,
+    **read_kwargs
+) -> int:
+    """
+    Ingest a local file or cached dataset straight into PostgreSQL, bypassing HTTP.
+
+    Batches are embedded and inserted by a pool of workers, each with its own
+    session. The checkpoint records the longest prefix of the source whose
+    batches are all committed, plus the batches committed beyond it. On failure,
+    queued batches are cancelled and in-flight ones are awaited and recorded, so
+    a resumed load skips them instead of inserting them twice.
+
+    Args:
+        source (str):
+            Source accepted by read_rows.
+        batch_size (int, optional):
+            Rows embedded and inserted per transaction (default: 256).
+        workers (int, optional):
+            Number of concurrent embed-and-insert workers (default: 2).
+        offset (int, optional):
+            Number of leading source rows to skip (default: 0).
+        checkpoint (str, optional):
+            Path of a checkpoint file updated as batches commit (default: None).
+        truncate (bool, optional):
+            Empty the documents table first (default: False).
+        defer_indexes (bool, optional):
+            Drop search indexes during the load and rebuild them in bulk afterwards (default: False).
+        committed (dict[int, int], optional):
+            Ranges beyond offset already committed, as returned by read_committed (default: None).
+        progress (Callable[[int, int, float], None], optional):
+            Called after each batch with rows ingested, committed offset and elapsed seconds (default: None).
+        index_progress (bool, optional):
+            Print progress while deferred search indexes are rebuilt (default: False).
+        **read_kwargs:
+            Forwarded to read_rows (title_column, content_column, split, chunk_size).
+
+    Returns:
+        int: Number of rows ingested by this run.
+    """
+
+    with get_session() as session:
+        if truncate:
+            session.execute(text("TRUNCATE TABLE documents RESTART IDENTITY CASCADE;"))
+            session.commit()
+
+        if defer_indexes:
+            with deferred_indexes(session, progress=index_progress):
+                return _run(source, batch_size, workers, offset, checkpoint, committed, progress, read_kwargs)
+        return _run(source, batch_size, workers, offset, checkpoint, committed, progress, read_kwargs)
+
+
+def _run(source, batch_size, workers, offset, checkpoint, committed, progress, read_kwargs) -> int:
+    """Drive the worker pool, keeping at most two batches per worker in flight."""
+
+    done_offsets = {start: size for start, size in (committed or {}).items() if start >= offset}
+    batches = _batched(read_rows(source, offset=offset, **read_kwargs), batch_size, offset, done_offsets)
+    pending = {}
+    prefix = offset
+    total = 0
+    error = None
+    start = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while pending or error is None:
+            # Keep the pool busy with a bounded number of batches in memory
+            while error is None and len(pending) < 2 * workers and (item := next(batches, None)) is not None:
+                batch_offset, batch = item
+                pending[pool.submit(_ingest_batch, batch)] = (batch_offset, len(batch))
+            if not pending:
+                break
+
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                batch_offset, size = pending.pop(future)
+                if future.cancelled():
+                    continue
+                if future.exception() is not None:
+                    # Stop queueing; batches already running still commit and are recorded
+                    error = error or future.exception()
+                    for queued in pending:
+                        queued.cancel()
+                    continue
+                done_offsets[batch_offset] = size
+                total += size
+
+            # Advance the checkpoint over the contiguous committed prefix
+            while prefix in done_offsets:
+                prefix += done_offsets.pop(prefix)
+            if checkpoint:
+                _write_checkpoint(checkpoint, source, prefix, done_offsets)
+            if progress is not None:
+                progress(total, prefix, time.perf_counter() - start)
+
+    if error is not None:
+        raise error
+    return total
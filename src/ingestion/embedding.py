@@ -2,45 +2,83 @@ import os
 import logging
 import numpy as np
 from sentence_transformers import SentenceTransformer
+from src.metrics import timed, MODEL_LOADS, CACHE_HITS, CACHE_MISSES
 
 # Suppress excessive logging, while keeping errors
 os.environ["TF_CPP_MIN_LOG_LEVEL"] = "3"
 os.environ["HF_HUB_DISABLE_PROGRESS_BARS"] = "1"
 logging.getLogger("transformers").setLevel(logging.ERROR)
 
-# Initialize module-level model singleton
-_MODEL: SentenceTransformer | None = None
+# Model used when none is specified, and the one the initial schema was built for
+DEFAULT_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
 
+# Initialize module-level model cache, keyed by model name
+_MODELS: dict[str, SentenceTransformer] = {}
 
-def get_model() -> SentenceTransformer:
+
+def get_model(name: str | None = None) -> SentenceTransformer:
     """
-    Retrieve the cached MiniLM model, loading it if necessary.
+    Retrieve a cached embedding model, loading it if necessary.
+
+    Args:
+        name (str, optional): Sentence-transformers model name (default: DEFAULT_MODEL, MiniLM).
     
     Returns:
         SentenceTransformer: A ready-to-use model instance.
     """
     
-    global _MODEL
-    if _MODEL is None:
-        _MODEL = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")
-    return _MODEL
+    name = name or DEFAULT_MODEL
+    if name not in _MODELS:
+        CACHE_MISSES.inc(cache="model")
+        with timed("model_load"):
+            _MODELS[name] = SentenceTransformer(name)
+        MODEL_LOADS.inc(model=name)
+    else:
+        CACHE_HITS.inc(cache="model")
+    return _MODELS[name]
 
 
-def embed_text(text: str) -> np.ndarray:
+def embed_text(text: str, model_name: str | None = None) -> np.ndarray:
     """
-    Generate a 384-dimensional normalized embedding using MiniLM.
+    Generate a normalized embedding, 384-dimensional with the default MiniLM model.
 
     Args:
         text (str): The text content to embed.
+        model_name (str, optional): Embedding model to use (default: DEFAULT_MODEL, MiniLM).
     
     Returns:
-        np.ndarray: Normalized embedding of shape (384,) as float32.
+        np.ndarray: Normalized embedding of shape (dim,) as float32, (384,) for MiniLM.
     """
 
-    model = get_model()
-    embedding = model.encode(
-        text,
-        convert_to_numpy=True,
-        normalize_embeddings=True
-    )
+    model = get_model(model_name)
+    with timed("embed"):
+        embedding = model.encode(
+            text,
+            convert_to_numpy=True,
+            normalize_embeddings=True
+        )
     return embedding.astype(np.float32)
+
+
+def embed_texts(texts: list[str], batch_size: int = 64, model_name: str | None = None) -> np.ndarray:
+    """
+    Generate normalized embeddings for many texts in batches.
+
+    Args:
+        texts (list[str]): The text contents to embed.
+        batch_size (int, optional): Number of texts encoded per forward pass (default: 64).
+        model_name (str, optional): Embedding model to use (default: DEFAULT_MODEL, MiniLM).
+    
+    Returns:
+        np.ndarray: Normalized embeddings of shape (len(texts), dim) as float32.
+    """
+
+    model = get_model(model_name)
+    with timed("embed_batch"):
+        embeddings = model.encode(
+            texts,
+            batch_size=batch_size,
+            convert_to_numpy=True,
+            normalize_embeddings=True
+        )
+    return embeddings.astype(np.float32)
@@ -0,0 +1,227 @@
+# Environment imports
+import os
+from dotenv import load_dotenv
+load_dotenv()
+
+# Core imports
+import time
+import argparse
+import threading
+from contextlib import contextmanager
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+from src.metrics import timed
+from src.ingestion.versioning import get_active_slot
+
+# Index build tuning, overridable per call
+HNSW_M = int(os.getenv("HNSW_M", "16"))
+HNSW_EF_CONSTRUCTION = int(os.getenv("HNSW_EF_CONSTRUCTION", "64"))
+MAINTENANCE_WORK_MEM = os.getenv("INDEX_MAINTENANCE_WORK_MEM", "1GB")
+PARALLEL_WORKERS = int(os.getenv("INDEX_PARALLEL_WORKERS", "4"))
+
+# Minimum upload size for which dropping and rebuilding indexes beats incremental maintenance
+DEFER_INDEXES_MIN_ROWS = int(os.getenv("DEFER_INDEXES_MIN_ROWS", "50000"))
+
+# Search indexes created by migration 6dd45946c9f9 (HNSW switched to L2 in b72e4d19a0c5)
+HNSW_INDEX = "idx_documents_embedding_hnsw"
+BIGM_INDEX = "idx_documents_content_bigm"
+
+
+def hnsw_index_name(column: str) -> str:
+    """Name of the HNSW index over an embedding slot."""
+
+    return f"idx_documents_{column}_hnsw"
+
+
+def drop_search_indexes(session, column: str | None = None) -> None:
+    """
+    Drop the HNSW and bigram indexes so bulk inserts skip incremental index maintenance.
+
+    Args:
+        session (sqlalchemy.orm.Session):
+            Active SQLAlchemy session bound to PostgreSQL.
+        column (str, optional):
+            Embedding slot whose HNSW index is dropped (default: None, the active slot).
+    """
+
+    column = column or get_active_slot(session).column
+    session.execute(text(f"DROP INDEX IF EXISTS {hnsw_index_name(column)};"))
+    session.execute(text(f"DROP INDEX IF EXISTS {BIGM_INDEX};"))
+    session.commit()
+
+
+def build_search_indexes(
+    session,
+    m: int = HNSW_M,
+    ef_construction: int = HNSW_EF_CONSTRUCTION,
+    maintenance_work_mem: str = MAINTENANCE_WORK_MEM,
+    parallel_workers: int = PARALLEL_WORKERS,
+    progress: bool = False,
+    column: str | None = None,
+    concurrently: bool = False
+) -> None:
+    """
+    Build the HNSW and bigram indexes in bulk with tuned maintenance settings.
+
+    Fails if the HNSW index already exists, since its build options could not be
+    applied; drop it first (e.g. with the rebuild action). The bigram index is
+    shared by every slot and has no options, so an existing one is kept. The HNSW index uses
+    L2 operators, matching <->, but only queries ordering by raw distance can use
+    it, such as the benchmark's vector_hnsw path. vector_search orders by score and
+    id to page exactly, so it scans and HNSW tuning does not affect it.
+
+    Args:
+        session (sqlalchemy.orm.Session):
+            Active SQLAlchemy session bound to PostgreSQL.
+        m (int, optional):
+            HNSW max connections per layer (default: HNSW_M, 16).
+        ef_construction (int, optional):
+            HNSW candidate list size during construction (default: HNSW_EF_CONSTRUCTION, 64).
+        maintenance_work_mem (str, optional):
+            Memory available to the build, ideally enough to hold the graph (default: 1GB).
+        parallel_workers (int, optional):
+            Value of max_parallel_maintenance_workers for the build (default: 4).
+        progress (bool, optional):
+            Print progress from pg_stat_progress_create_index while building (default: False).
+        column (str, optional):
+            Embedding slot to index (default: None, the active slot).
+        concurrently (bool, optional):
+            Build without blocking writes, e.g. on a slot live traffic is writing to (default: False).
+    """
+
+    # Use one dedicated autocommit connection so tuned settings apply to every build,
+    # and no open transaction holds back a concurrent build
+    engine = session.get_bind()
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        column = column or get_active_slot(conn).column
+        hnsw_index = hnsw_index_name(column)
+        concurrent = "CONCURRENTLY" if concurrently else ""
+        statements = [
+            (hnsw_index, f"""
+                CREATE INDEX {concurrent} {hnsw_index}
+                ON documents
+                USING hnsw ({column} vector_l2_ops)
+                WITH (m = {int(m)}, ef_construction = {int(ef_construction)});
+            """),
+            (BIGM_INDEX, f"""
+                CREATE INDEX {concurrent} {BIGM_INDEX}
+                ON documents
+                USING gin (content gin_bigm_ops);
+            """),
+        ]
+
+        # Refuse to silently keep an HNSW index built with other options
+        exists = text("SELECT to_regclass(:name) IS NOT NULL")
+        if conn.execute(exists, {"name": hnsw_index}).scalar():
+            raise RuntimeError(f"Index {hnsw_index} already exists; drop it first to rebuild with new options.")
+        if conn.execute(exists, {"name": BIGM_INDEX}).scalar():
+            if progress:
+                print(f"Kept existing {BIGM_INDEX}")
+            statements = statements[:1]
+
+        try:
+            # Tune maintenance settings for this connection only
+            conn.execute(text("SELECT set_config('maintenance_work_mem', :v, false);"), {"v": maintenance_work_mem})
+            conn.execute(
+                text("SELECT set_config('max_parallel_maintenance_workers', :v, false);"),
+                {"v": str(int(parallel_workers))},
+            )
+
+            # Build each index, reporting progress from a separate connection
+            for name, sql in statements:
+                start = time.perf_counter()
+                with _report_progress(engine, name, enabled=progress), timed("index_build"):
+                    conn.execute(text(sql))
+                if progress:
+                    print(f"Built {name} in {time.perf_counter() - start:.1f}s")
+        finally:
+            # Restore connection defaults even after a failed build, so the pool never hands out tuned settings
+            try:
+                conn.execute(text("RESET maintenance_work_mem;"))
+                conn.execute(text("RESET max_parallel_maintenance_workers;"))
+            except SQLAlchemyError:
+                # Discard a connection that cannot be reset, e.g. one that was lost mid-build
+                conn.invalidate()
+
+        # Refresh planner statistics
+        conn.execute(text("ANALYZE documents;"))
+
+
+@contextmanager
+def deferred_indexes(session, **build_kwargs):
+    """
+    Bulk-load mode: drop search indexes on entry and rebuild them in bulk on exit.
+
+    Args:
+        session (sqlalchemy.orm.Session):
+            Active SQLAlchemy session bound to PostgreSQL.
+        **build_kwargs:
+            Forwarded to build_search_indexes.
+    """
+
+    drop_search_indexes(session)
+    try:
+        yield
+    finally:
+        session.rollback()
+        build_search_indexes(session, **build_kwargs)
+
+
+@contextmanager
+def _report_progress(engine, index_name: str, enabled: bool, interval: float = 2.0):
+    """Poll pg_stat_progress_create_index in a background thread while an index builds."""
+
+    if not enabled:
+        yield
+        return
+
+    stop = threading.Event()
+
+    def poll():
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            while not stop.wait(interval):
+                row = conn.execute(text("""
+                    SELECT phase, blocks_done, blocks_total, tuples_done, tuples_total
+                    FROM pg_stat_progress_create_index
+                    WHERE relid = 'documents'::regclass
+                """)).first()
+                if row is None:
+                    continue
+                done, total = (row.tuples_done, row.tuples_total) if row.tuples_total else (row.blocks_done, row.blocks_total)
+                pct = f"{100 * done / total:.1f}%" if total else "n/a"
+                print(f"  {index_name}: {row.phase} ({pct})")
+
+    thread = threading.Thread(target=poll, daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+if __name__ == "__main__":
+    from src.db import get_session
+
+    parser = argparse.ArgumentParser(description="Drop or rebuild the documents search indexes for bulk loads.")
+    parser.add_argument("action", choices=["drop", "build", "rebuild"])
+    parser.add_argument("--m", type=int, default=HNSW_M)
+    parser.add_argument("--ef-construction", type=int, default=HNSW_EF_CONSTRUCTION)
+    parser.add_argument("--maintenance-work-mem", default=MAINTENANCE_WORK_MEM)
+    parser.add_argument("--parallel-workers", type=int, default=PARALLEL_WORKERS)
+    parser.add_argument("--no-progress", action="store_true")
+    args = parser.parse_args()
+
+    with get_session() as session:
+        if args.action in ("drop", "rebuild"):
+            drop_search_indexes(session)
+            print("Dropped search indexes")
+        if args.action in ("build", "rebuild"):
+            build_search_indexes(
+                session,
+                m=args.m,
+                ef_construction=args.ef_construction,
+                maintenance_work_mem=args.maintenance_work_mem,
+                parallel_workers=args.parallel_workers,
+                progress=not args.no_progress,
+            )
@@ -0,0 +1,340 @@
+import time
+import argparse
+from sqlalchemy import text
+
+from src.db import get_session
+from src.ingestion.embedding import embed_texts, get_model
+from src.ingestion.indexes import build_search_indexes, hnsw_index_name
+from src.ingestion.versioning import get_active_slot, invalidate_cached_slot, standby_column, SLOTS
+from src.metrics import ROWS_REEMBEDDED
+
+
+def _model_dim(model: str) -> int:
+    """Load a model, outside any transaction, and return its embedding dimension."""
+
+    return get_model(model).get_sentence_embedding_dimension()
+
+
+def _column_dim(session, column: str) -> int:
+    """Declared dimension of a vector column on documents, -1 when dimensionless."""
+
+    return session.execute(text("""
+        SELECT atttypmod
+        FROM pg_attribute
+        WHERE attrelid = 'documents'::regclass AND attname = :column AND NOT attisdropped
+    """), {"column": column}).scalar()
+
+
+def _index_valid(session, name: str) -> bool | None:
+    """Whether an index is valid, None when it does not exist."""
+
+    return session.execute(text("""
+        SELECT i.indisvalid
+        FROM pg_class c
+        JOIN pg_index i ON i.indexrelid = c.oid
+        WHERE c.relname = :name
+    """), {"name": name}).scalar()
+
+
+def _drop_index_concurrently(session, name: str) -> None:
+    """Drop an index without blocking reads or writes of documents."""
+
+    with session.get_bind().connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name};"))
+
+
+def _embed_rows(session, column: str, model: str, rows) -> int:
+    """Embed rows with the target model and write them into a slot, tagged with the model."""
+
+    # Embed lowercased contents, matching the ingestion pipeline
+    embeddings = embed_texts([r.content.lower() for r in rows], model_name=model)
+
+    # Write embeddings into the slot, tagged with their model
+    session.execute(text(f"""
+        UPDATE documents
+        SET {column} = CAST(:embedding AS vector), {SLOTS[column]} = :model
+        WHERE id = :id
+    """), [
+        {"id": r.id, "embedding": embedding.tolist(), "model": model}
+        for r, embedding in zip(rows, embeddings)
+    ])
+    ROWS_REEMBEDDED.inc(len(rows), model=model)
+    return len(rows)
+
+
+def _catch_up(
+    session,
+    column: str,
+    model: str,
+    batch_size: int,
+    rows_per_second: float | None = None,
+    progress=None
+) -> int:
+    """
+    Embed every row not yet tagged with the model into a slot, one committed batch at a time.
+
+    Batches advance along the primary key, so every row is read once, and each
+    commits in its own short transaction that only locks the rows it updates.
+
+    Args:
+        session (sqlalchemy.orm.Session):
+            Active SQLAlchemy session bound to PostgreSQL.
+        column (str):
+            Slot to write.
+        model (str):
+            Sentence-transformers model name to embed with.
+        batch_size (int):
+            Rows embedded and updated per transaction.
+        rows_per_second (float, optional):
+            Upper bound on throughput to protect live traffic (default: None, unthrottled).
+        progress (Callable[[int, str], None], optional):
+            Called after each batch with rows embedded so far and the slot written (default: None).
+
+    Returns:
+        int: Number of rows embedded.
+    """
+
+    total = 0
+    last_id = 0
+    while True:
+        start = time.perf_counter()
+
+        # Select the next rows missing an embedding from the target model
+        rows = session.execute(text(f"""
+            SELECT id, content
+            FROM documents
+            WHERE id > :last_id AND {SLOTS[column]} IS DISTINCT FROM :model
+            ORDER BY id
+            LIMIT :limit
+        """), {"last_id": last_id, "model": model, "limit": batch_size}).fetchall()
+        if not rows:
+            session.rollback()
+            return total
+        total += _embed_rows(session, column, model, rows)
+        session.commit()
+        last_id = rows[-1].id
+        if progress is not None:
+            progress(total, column)
+
+        # Throttle to the requested rate
+        if rows_per_second:
+            time.sleep(max(0.0, len(rows) / rows_per_second - (time.perf_counter() - start)))
+
+
+def prepare_standby(session, column: str, model: str, dim: int) -> None:
+    """
+    Type the standby slot to the model's dimension and drop its HNSW index for the backfill.
+
+    A slot typed to another dimension is dropped and re-added, which only touches the
+    catalog, so it holds its exclusive lock for an instant rather than rewriting the
+    table. Otherwise its index is dropped concurrently if rows still need embedding,
+    so backfill updates skip graph maintenance; it is rebuilt in bulk afterwards.
+
+    Args:
+        session (sqlalchemy.orm.Session):
+            Active SQLAlchemy session bound to PostgreSQL.
+        column (str):
+            Standby slot to prepare.
+        model (str):
+            Model the slot will be backfilled with.
+        dim (int):
+            Embedding dimension of the model.
+    """
+
+    if _column_dim(session, column) != dim:
+        # Refuse to touch the slot serving search, then retype it
+        active = session.execute(text("SELECT active_column FROM embedding_state WHERE id = 1 FOR SHARE")).scalar()
+        if active == column:
+            session.rollback()
+            raise RuntimeError(f"Slot '{column}' is serving search and cannot be retyped.")
+        session.execute(text("SET LOCAL lock_timeout = '5s'"))
+        session.execute(text(f"""
+            ALTER TABLE documents
+                DROP COLUMN {column},
+                DROP COLUMN {SLOTS[column]},
+                ADD COLUMN {column} vector({int(dim)}),
+                ADD COLUMN {SLOTS[column]} VARCHAR
+        """))
+        session.commit()
+        return
+
+    pending = session.execute(
+        text(f"SELECT EXISTS (SELECT 1 FROM documents WHERE {SLOTS[column]} IS DISTINCT FROM :model)"),
+        {"model": model},
+    ).scalar()
+    session.rollback()
+    if pending:
+        _drop_index_concurrently(session, hnsw_index_name(column))
+
+
+def build_standby_index(session, column: str) -> None:
+    """
+    Build the HNSW index of the standby slot without blocking writes, replacing a failed build.
+
+    Args:
+        session (sqlalchemy.orm.Session):
+            Active SQLAlchemy session bound to PostgreSQL.
+        column (str):
+            Standby slot to index.
+    """
+
+    name = hnsw_index_name(column)
+    valid = _index_valid(session, name)
+    session.rollback()
+    if valid is False:
+        _drop_index_concurrently(session, name)
+    if valid is not True:
+        build_search_indexes(session, column=column, concurrently=True)
+
+
+def backfill(model: str, batch_size: int = 256, rows_per_second: float | None = None, progress=None) -> int:
+    """
+    Re-embed every document with a new model into the standby slot, in throttled batches.
+
+    Search keeps serving from the active slot the whole time. Each batch commits
+    in its own short transaction and only locks the rows it updates. Safe to stop
+    and restart: rows already tagged with the target model are skipped. The standby
+    HNSW index is built concurrently at the end.
+
+    Args:
+        model (str):
+            Sentence-transformers model name to re-embed with.
+        batch_size (int, optional):
+            Rows embedded and updated per transaction (default: 256).
+        rows_per_second (float, optional):
+            Upper bound on throughput to protect live traffic (default: None, unthrottled).
+        progress (Callable[[int, str], None], optional):
+            Called after each batch with rows re-embedded so far and the standby slot (default: None).
+
+    Returns:
+        int: Number of rows re-embedded.
+    """
+
+    dim = _model_dim(model)
+    with get_session() as session:
+        column = standby_column(get_active_slot(session).column)
+        prepare_standby(session, column, model, dim)
+        total = _catch_up(session, column, model, batch_size, rows_per_second, progress=progress)
+        build_standby_index(session, column)
+    return total
+
+
+def cutover(model: str, max_catch_up: int = 256, batch_size: int = 256, progress=None) -> str:
+    """
+    Atomically switch search to the standby slot once it holds the target model.
+
+    The model is loaded, the standby index checked, and rows inserted since the
+    backfill embedded before any lock is taken. The state row is then locked, so
+    ingestion writers (which read it FOR SHARE) either finish before the switch or
+    wait and then write to the new slot. Writes are blocked with a SHARE lock only
+    while the rows inserted during that catch-up are embedded; reads are never blocked.
+
+    Args:
+        model (str):
+            Model the standby slot was backfilled with.
+        max_catch_up (int, optional):
+            Refuse to cut over if more rows than this still need embedding under the lock (default: 256).
+        batch_size (int, optional):
+            Rows embedded per batch during catch-up (default: 256).
+        progress (Callable[[int, str], None], optional):
+            Called after each batch embedded before locking, with rows embedded so far and the standby slot (default: None).
+
+    Returns:
+        str: Slot now serving search.
+    """
+
+    dim = _model_dim(model)
+    with get_session() as session:
+        # Check the standby slot is typed for the model and indexed
+        active = get_active_slot(session)
+        column = standby_column(active.column)
+        if _column_dim(session, column) != dim:
+            session.rollback()
+            raise RuntimeError(f"Slot '{column}' is not typed for '{model}'; run backfill first.")
+        build_standby_index(session, column)
+
+        # Embed rows inserted since the backfill without blocking writers
+        _catch_up(session, column, model, batch_size, progress=progress)
+
+        # Lock state, then block writers while embedding the last few rows
+        state = session.execute(text("SELECT active_column FROM embedding_state WHERE id = 1 FOR UPDATE")).first()
+        if state is None or state.active_column != active.column:
+            session.rollback()
+            raise RuntimeError("The active slot changed during cutover; retry.")
+        session.execute(text("LOCK TABLE documents IN SHARE MODE"))
+
+        # Embed rows inserted during the catch-up, in one sweep
+        rows = session.execute(text(f"""
+            SELECT id, content
+            FROM documents
+            WHERE {SLOTS[column]} IS DISTINCT FROM :model
+            ORDER BY id
+            LIMIT :limit
+        """), {"model": model, "limit": max_catch_up + 1}).fetchall()
+        if len(rows) > max_catch_up:
+            session.rollback()
+            raise RuntimeError(f"More than {max_catch_up} rows still need '{model}' embeddings after catch-up; retry when ingestion is quieter.")
+        for i in range(0, len(rows), batch_size):
+            _embed_rows(session, column, model, rows[i:i + batch_size])
+
+        # Switch search to the standby slot
+        session.execute(text("""
+            UPDATE embedding_state
+            SET active_column = :column, model = :model, dim = :dim, updated_at = now()
+            WHERE id = 1
+        """), {"column": column, "model": model, "dim": dim})
+        session.commit()
+
+    invalidate_cached_slot()
+    return column
+
+
+def status() -> dict:
+    """
+    Report the active slot, and the standby slot's dimension, index and coverage per model.
+
+    Returns:
+        dict: Active slot and model, standby slot dimension, index validity and row counts per model.
+    """
+
+    with get_session() as session:
+        active = get_active_slot(session)
+        column = standby_column(active.column)
+        rows = session.execute(text(f"""
+            SELECT {SLOTS[column]} AS model, COUNT(*) AS n
+            FROM documents
+            GROUP BY 1
+        """)).fetchall()
+        return {
+            "active_column": active.column,
+            "active_model": active.model,
+            "standby_column": column,
+            "standby_dim": _column_dim(session, column),
+            "standby_index_valid": _index_valid(session, hnsw_index_name(column)),
+            "standby_models": {r.model: r.n for r in rows},
+        }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-embed documents with a new model, then cut search over to it.")
+    subparsers = parser.add_subparsers(dest="action", required=True)
+    backfill_parser = subparsers.add_parser("backfill")
+    backfill_parser.add_argument("--model", required=True)
+    backfill_parser.add_argument("--batch-size", type=int, default=256)
+    backfill_parser.add_argument("--rows-per-second", type=float)
+    cutover_parser = subparsers.add_parser("cutover")
+    cutover_parser.add_argument("--model", required=True)
+    cutover_parser.add_argument("--max-catch-up", type=int, default=256)
+    subparsers.add_parser("status")
+    args = parser.parse_args()
+
+    def report(total: int, column: str) -> None:
+        print(f"Re-embedded {total} rows into '{column}' with '{args.model}'")
+
+    if args.action == "backfill":
+        backfill(args.model, batch_size=args.batch_size, rows_per_second=args.rows_per_second, progress=report)
+    elif args.action == "cutover":
+        column = cutover(args.model, max_catch_up=args.max_catch_up, progress=report)
+        print(f"Search now serves '{column}' embedded with '{args.model}'")
+    else:
+        print(status())
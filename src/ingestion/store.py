@@ -1,6 +1,15 @@
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 from src.models.document import Document
-from src.ingestion.embedding import embed_text
+from src.ingestion.embedding import embed_text, embed_texts
+from src.ingestion.versioning import EmbeddingSlot, get_active_slot
+from src.metrics import ROWS_INGESTED
+
+
+def _embedding_values(slot: EmbeddingSlot, embedding: list) -> dict:
+    """Column values storing an embedding in the active slot, tagged with its model."""
+
+    return {slot.column: embedding, slot.model_column: slot.model}
 
 
 def add_document(session: Session, content: str, embedding: list, title: str = None) -> Document:
@@ -13,7 +22,7 @@ def add_document(session: Session, content: str, embedding: list, title: str = N
         content (str):
             Main textual content.
         embedding (list):
-            Precomputed embedding vector, e.g., 384 * [0].
+            Precomputed embedding vector from the active model, e.g., 384 * [0].
         title (str, optional):
             Title of the document.
 
@@ -21,13 +30,15 @@ def add_document(session: Session, content: str, embedding: list, title: str = N
         Document: ORM object after being committed to database.
     """
 
-    # Create a new Document ORM object with specified embedding
-    doc = Document(title=title, content=content, embedding=embedding)
+    # Create a new Document ORM object with specified embedding in the active slot
+    slot = get_active_slot(session, lock=True)
+    doc = Document(title=title, content=content, **_embedding_values(slot, embedding))
 
     # Execute transaction: add, commit and refresh    
     session.add(doc)
     session.commit()
     session.refresh(doc)
+    ROWS_INGESTED.inc()
 
     # Return the persisted Document object    
     return doc
@@ -49,16 +60,50 @@ def ingest_document(session: Session, title: str, content: str) -> Document:
         Document: ORM object after being committed to database.
     """
     
-    # Embed text using MiniLM
-    embedding = embed_text(content)
+    # Embed text using the active model (MiniLM by default)
+    slot = get_active_slot(session, lock=True)
+    embedding = embed_text(content, model_name=slot.model)
 
     # Create a new Document ORM object with computed embedding    
-    doc = Document(title=title, content=content, embedding=embedding.tolist())
+    doc = Document(title=title, content=content, **_embedding_values(slot, embedding.tolist()))
     
     # Execute transaction: add, commit and refresh
     session.add(doc)
     session.commit()
     session.refresh(doc)
+    ROWS_INGESTED.inc()
     
     # Return the persisted Document object
     return doc
+
+
+def ingest_documents(session: Session, titles: list[str | None], contents: list[str]) -> int:
+    """
+    Ingest many documents at once with batched embedding and a single bulk insert.
+
+    Args:
+        session (sqlalchemy.orm.Session):
+            Active SQLAlchemy session bound to PostgreSQL.
+        titles (list[str | None]):
+            Titles of the documents.
+        contents (list[str]):
+            Main textual contents, aligned with titles.
+
+    Returns:
+        int: Number of documents committed to database.
+    """
+
+    # Embed lowercased contents in batches with the active model, matching the upload pipeline
+    slot = get_active_slot(session, lock=True)
+    embeddings = embed_texts([content.lower() for content in contents], model_name=slot.model)
+
+    # Execute transaction: bulk insert and commit, skipping ORM object construction
+    session.execute(insert(Document), [
+        {"title": title, "content": content, **_embedding_values(slot, embedding.tolist())}
+        for title, content, embedding in zip(titles, contents, embeddings)
+    ])
+    session.commit()
+    ROWS_INGESTED.inc(len(contents))
+
+    # Return the number of persisted rows
+    return len(contents)
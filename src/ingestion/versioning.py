@@ -0,0 +1,94 @@
+import time
+import threading
+from typing import NamedTuple
+from sqlalchemy import text
+from src.ingestion.embedding import DEFAULT_MODEL
+
+# Embedding slots on the documents table, mapped to the column tagging their model
+SLOTS = {
+    "embedding": "embedding_model",
+    "embedding_next": "embedding_next_model",
+}
+
+# Seconds search processes may serve from a cached state after a cutover
+STATE_TTL_SECONDS = 5.0
+
+# Initialize module-level state cache
+_STATE: tuple[float, "EmbeddingSlot"] | None = None
+_STATE_LOCK = threading.Lock()
+
+
+class EmbeddingSlot(NamedTuple):
+    """An embedding column on documents, with its model tag column and the model it holds."""
+
+    column: str
+    model_column: str
+    model: str
+    dim: int
+
+
+def standby_column(active_column: str) -> str:
+    """Return the slot not currently serving search."""
+
+    return next(column for column in SLOTS if column != active_column)
+
+
+def get_active_slot(session, lock: bool = False) -> EmbeddingSlot:
+    """
+    Read the slot serving search from embedding_state.
+
+    Writers pass lock=True so the read takes a share lock on the state row: a
+    concurrent cutover then waits for the writer to commit, and a writer starting
+    during a cutover waits for it and sees the new slot.
+
+    Args:
+        session (sqlalchemy.orm.Session):
+            Active SQLAlchemy session bound to PostgreSQL.
+        lock (bool, optional):
+            Hold FOR SHARE on the state row until the transaction ends (default: False).
+
+    Returns:
+        EmbeddingSlot: The active slot.
+    """
+
+    row = session.execute(text(f"""
+        SELECT active_column, model, dim
+        FROM embedding_state
+        WHERE id = 1
+        {"FOR SHARE" if lock else ""}
+    """)).first()
+
+    # Fall back to the pre-versioning layout
+    if row is None:
+        return EmbeddingSlot("embedding", SLOTS["embedding"], DEFAULT_MODEL, 384)
+    return EmbeddingSlot(row.active_column, SLOTS[row.active_column], row.model, row.dim)
+
+
+def cached_active_slot(session) -> EmbeddingSlot:
+    """
+    Read the active slot for search, cached for STATE_TTL_SECONDS.
+
+    A stale read stays consistent: the previous slot keeps its embeddings after a
+    cutover, and the query is embedded with the model of whichever slot is returned.
+
+    Args:
+        session (sqlalchemy.orm.Session):
+            Active SQLAlchemy session bound to PostgreSQL.
+
+    Returns:
+        EmbeddingSlot: The active slot.
+    """
+
+    global _STATE
+    with _STATE_LOCK:
+        if _STATE is None or time.monotonic() - _STATE[0] >= STATE_TTL_SECONDS:
+            _STATE = (time.monotonic(), get_active_slot(session))
+        return _STATE[1]
+
+
+def invalidate_cached_slot() -> None:
+    """Drop the cached active slot, e.g. right after a cutover in this process."""
+
+    global _STATE
+    with _STATE_LOCK:
+        _STATE = None
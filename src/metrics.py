@@ -0,0 +1,192 @@
+# Environment imports
+import os
+from dotenv import load_dotenv
+load_dotenv()
+
+# Core imports
+import time
+import logging
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from sqlalchemy import text
+
+# Opt-in Server-Timing header and slow-query log threshold (milliseconds, disabled when unset)
+SERVER_TIMING = os.getenv("METRICS_SERVER_TIMING", "0").lower() in ("1", "true", "yes")
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS")) if os.getenv("SLOW_QUERY_MS") else None
+
+# Default Prometheus latency buckets, in seconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Logger receiving EXPLAIN ANALYZE output of slow queries
+slow_query_log = logging.getLogger("rag.slow_query")
+
+# Per-request stage timings, used to build the Server-Timing header
+_request_timings: ContextVar[list | None] = ContextVar("request_timings", default=None)
+
+
+def _format_labels(labels: tuple[tuple[str, str], ...]) -> str:
+    """Render a label set in Prometheus exposition format."""
+
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+
+class Counter:
+    """Monotonic counter, optionally split by labels."""
+
+    def __init__(self, name: str, description: str):
+        self.name = name
+        self.description = description
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(key)} {value}")
+        return lines
+
+
+class Histogram:
+    """Cumulative histogram with fixed buckets, optionally split by labels."""
+
+    def __init__(self, name: str, description: str, buckets: tuple[float, ...] = BUCKETS):
+        self.name = name
+        self.description = description
+        self.buckets = buckets
+        self._values: dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            counts, total = self._values.setdefault(key, [[0] * (len(self.buckets) + 1), 0.0])
+            counts[bisect_left(self.buckets, value)] += 1
+            self._values[key][1] = total + value
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, count in zip((*self.buckets, "+Inf"), counts):
+                    cumulative += count
+                    labels = _format_labels((*key, ("le", str(bound))))
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {total}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {cumulative}")
+        return lines
+
+
+# Registered metrics
+STAGE_SECONDS = Histogram("rag_stage_seconds", "Time spent in each hot-path stage.")
+REQUEST_SECONDS = Histogram("rag_request_seconds", "End-to-end HTTP request latency.")
+MODEL_LOADS = Counter("rag_model_loads_total", "Number of model loads from disk.")
+CACHE_HITS = Counter("rag_cache_hits_total", "Number of cache hits.")
+CACHE_MISSES = Counter("rag_cache_misses_total", "Number of cache misses.")
+ROWS_INGESTED = Counter("rag_rows_ingested_total", "Number of documents ingested.")
+ROWS_REEMBEDDED = Counter("rag_rows_reembedded_total", "Number of documents re-embedded with a new model.")
+SLOW_QUERIES = Counter("rag_slow_queries_total", "Number of SQL queries above SLOW_QUERY_MS.")
+DB_SESSIONS = Counter("rag_db_sessions_total", "Number of read sessions opened, by routing target.")
+REGISTRY = [
+    STAGE_SECONDS, REQUEST_SECONDS, MODEL_LOADS, CACHE_HITS, CACHE_MISSES,
+    ROWS_INGESTED, ROWS_REEMBEDDED, SLOW_QUERIES, DB_SESSIONS,
+]
+
+
+def render() -> str:
+    """
+    Render all registered metrics in Prometheus text exposition format.
+
+    Returns:
+        str: Exposition payload for the /metrics endpoint.
+    """
+
+    return "\n".join(line for metric in REGISTRY for line in metric.render()) + "\n"
+
+
+@contextmanager
+def timed(stage: str):
+    """
+    Time a hot-path stage, recording it in the stage histogram and the current request.
+
+    Args:
+        stage (str): Stage name, e.g. 'embed' or 'sql'.
+    """
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, stage=stage)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings.append((stage, elapsed))
+
+
+def start_request_timing() -> None:
+    """Start collecting stage timings for the current request."""
+
+    _request_timings.set([])
+
+
+def server_timing_header() -> str:
+    """
+    Build a Server-Timing header value from the stages recorded in the current request.
+
+    Returns:
+        str: Header value, aggregating repeated stages, e.g. 'embed;dur=12.3, sql;dur=4.1'.
+    """
+
+    totals: dict[str, float] = {}
+    for stage, elapsed in _request_timings.get() or []:
+        totals[stage] = totals.get(stage, 0.0) + elapsed
+    return ", ".join(f"{stage};dur={elapsed * 1000:.1f}" for stage, elapsed in totals.items())
+
+
+def timed_query(session, sql, params: dict, stage: str = "sql") -> list:
+    """
+    Execute a SQL statement and fetch all rows, timing it as a stage.
+
+    When SLOW_QUERY_MS is set and the query exceeds it, the statement is re-run
+    under EXPLAIN ANALYZE and the plan is logged to 'rag.slow_query'. The query
+    therefore executes twice when slow, so keep the threshold for diagnosis.
+
+    Args:
+        session (sqlalchemy.orm.Session):
+            Active SQLAlchemy session bound to PostgreSQL.
+        sql (sqlalchemy.TextClause):
+            Statement to execute.
+        params (dict):
+            Bind parameters.
+        stage (str, optional):
+            Stage name recorded in metrics (default: 'sql').
+
+    Returns:
+        list: Fetched rows.
+    """
+
+    start = time.perf_counter()
+    with timed(stage):
+        rows = session.execute(sql, params).fetchall()
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    # Log query plan of slow queries
+    if SLOW_QUERY_MS is not None and elapsed_ms >= SLOW_QUERY_MS:
+        SLOW_QUERIES.inc(stage=stage)
+        plan = session.execute(text(f"EXPLAIN (ANALYZE, BUFFERS) {sql}"), params).fetchall()
+        slow_query_log.warning(
+            "Slow query (%.1f ms, stage=%s):\n%s\n%s",
+            elapsed_ms, stage, str(sql).strip(), "\n".join(r[0] for r in plan)
+        )
+    return rows
@@ -10,6 +10,7 @@ from logging.config import fileConfig
 from alembic import context
 from sqlalchemy import create_engine
 from src.models.document import Base
+from src.models.embedding_state import EmbeddingState  # noqa: F401 (register table in metadata)
 
 # Retrieve database URL
 DATABASE_URL = os.getenv("DATABASE_URL")
@@ -0,0 +1,55 @@
+"""embedding model versioning
+
+Revision ID: 3f8a2c7d9b14
+Revises: 6dd45946c9f9
+Create Date: 2025-11-20 09:41:27.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import pgvector
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f8a2c7d9b14'
+down_revision: Union[str, Sequence[str], None] = '6dd45946c9f9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Model that produced all embeddings stored before versioning
+INITIAL_MODEL = 'sentence-transformers/all-MiniLM-L6-v2'
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Tag existing rows via a constant default (metadata-only, no table rewrite), then drop it
+    op.add_column('documents', sa.Column('embedding_model', sa.String(), server_default=INITIAL_MODEL, nullable=True))
+    op.alter_column('documents', 'embedding_model', server_default=None)
+
+    # Standby embedding slot, typed to its model's dimension and indexed by reembed before first use
+    op.add_column('documents', sa.Column('embedding_next', pgvector.sqlalchemy.Vector(), nullable=True))
+    op.add_column('documents', sa.Column('embedding_next_model', sa.String(), nullable=True))
+
+    # Single-row pointer to the slot and model serving search
+    op.create_table('embedding_state',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('active_column', sa.String(), nullable=False),
+    sa.Column('model', sa.String(), nullable=False),
+    sa.Column('dim', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.execute(f"""
+        INSERT INTO embedding_state (id, active_column, model, dim)
+        VALUES (1, 'embedding', '{INITIAL_MODEL}', 384);
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('embedding_state')
+    op.drop_column('documents', 'embedding_next_model')
+    op.drop_column('documents', 'embedding_next')
+    op.drop_column('documents', 'embedding_model')
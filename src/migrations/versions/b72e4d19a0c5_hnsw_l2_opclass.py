@@ -0,0 +1,40 @@
+"""hnsw l2 opclass
+
+Revision ID: b72e4d19a0c5
+Revises: 3f8a2c7d9b14
+Create Date: 2025-11-24 14:02:51.907316
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import pgvector
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b72e4d19a0c5'
+down_revision: Union[str, Sequence[str], None] = '3f8a2c7d9b14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Raw-distance queries (the benchmark's vector_hnsw path) order by <->, which a cosine-ops HNSW index cannot serve
+    op.execute("DROP INDEX IF EXISTS idx_documents_embedding_hnsw;")
+    op.execute("""
+        CREATE INDEX idx_documents_embedding_hnsw
+        ON documents
+        USING hnsw (embedding vector_l2_ops);
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP INDEX IF EXISTS idx_documents_embedding_hnsw;")
+    op.execute("""
+        CREATE INDEX idx_documents_embedding_hnsw
+        ON documents
+        USING hnsw (embedding vector_cosine_ops);
+    """)
@@ -9,5 +9,9 @@ class Document(Base):
     id = Column(Integer, primary_key=True, autoincrement=True)
     title = Column(String, nullable=True)
     content = Column(Text, nullable=False)
-    embedding = Column(Vector(384))
+    # Slots are dimensionless here; reembed types each column to its model's dimension
+    embedding = Column(Vector())
+    embedding_model = Column(String, nullable=True)
+    embedding_next = Column(Vector(), nullable=True)
+    embedding_next_model = Column(String, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
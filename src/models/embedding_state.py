@@ -0,0 +1,12 @@
+from sqlalchemy import Column, Integer, String, DateTime, func
+from src.models.base import Base
+
+
+class EmbeddingState(Base):
+    __tablename__ = "embedding_state"
+
+    id = Column(Integer, primary_key=True)
+    active_column = Column(String, nullable=False)
+    model = Column(String, nullable=False)
+    dim = Column(Integer, nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -0,0 +1,501 @@
+# Environment imports
+import os
+from dotenv import load_dotenv
+load_dotenv()
+
+# Core imports
+import json
+import time
+import shutil
+import threading
+from contextlib import contextmanager
+from typing import NamedTuple
+import numpy as np
+from numpy.lib.format import open_memmap
+from sqlalchemy import Integer, text
+from pgvector.sqlalchemy import Vector
+from src.db import get_session, get_read_session
+from src.metrics import timed
+from src.ingestion.versioning import EmbeddingSlot, get_active_slot, cached_active_slot
+from src.retrieval.watermark import TableState, table_state
+
+# Cross-process file locking is POSIX only; elsewhere refreshes are only serialized per process
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Retrieve index configuration, leaving the in-process index disabled when unset
+ANN_INDEX_DIR = os.getenv("ANN_INDEX_DIR")
+ANN_REFRESH_SECONDS = float(os.getenv("ANN_REFRESH_SECONDS", "60"))
+
+# Rows fetched per round trip, and copied per step when writing a snapshot
+ANN_CHUNK_ROWS = 10_000
+
+# Score error bounds: float32 expanded L2 distances (worst for documents nearly identical
+# to the query), and float64 distances against pgvector's float32 sums
+ANN_COARSE_EPSILON = 1e-2
+ANN_SCORE_EPSILON = 1e-5
+
+# Initialize module-level index singleton and its background refresh
+_INDEX = None
+_INDEX_LOCK = threading.Lock()
+_REFRESH_THREAD = None
+
+
+class Snapshot(NamedTuple):
+    """Immutable index contents, swapped as a whole so searches never see mismatched arrays."""
+
+    ids: np.ndarray
+    vectors: np.ndarray
+    sq_norms: np.ndarray
+    watermark: int
+    column: str
+    model: str | None
+    generation: int | None
+    deleted: int | None
+
+
+def _empty_snapshot(
+    dim: int = 384,
+    column: str = "embedding",
+    model: str | None = None,
+    state: TableState | None = None
+) -> Snapshot:
+    """Snapshot of an empty index, tagged with the table state it is built from."""
+
+    return Snapshot(
+        np.empty(0, dtype=np.int64), np.empty((0, dim), dtype=np.float32), np.empty(0, dtype=np.float32),
+        0, column, model, state.generation if state else None, state.deleted if state else None
+    )
+
+
+class FlatIndex:
+    """
+    Exact in-process nearest neighbour index over the active embedding slot of documents.
+
+    Scores approximate vector_search's (1 - L2 distance) in float32. Searches can
+    return every candidate within an error bound of the top results, so only those
+    rows need scoring by pgvector, keeping scores and cursors identical on both paths.
+    Each snapshot is written to its own directory and published by atomically
+    replacing the CURRENT pointer file, so worker processes sharing ANN_INDEX_DIR
+    always open a complete snapshot, memory-mapped through the page cache.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.snapshot = _empty_snapshot()
+        self.snapshot_name = None
+        self.refreshed_at = 0.0
+
+    def __len__(self) -> int:
+        return len(self.snapshot.ids)
+
+    @property
+    def column(self) -> str:
+        return self.snapshot.column
+
+    @property
+    def model(self) -> str | None:
+        return self.snapshot.model
+
+    @property
+    def watermark(self) -> int:
+        return self.snapshot.watermark
+
+    def serves(self, slot: EmbeddingSlot) -> bool:
+        """Whether a loaded snapshot was built from the given slot and model."""
+
+        snapshot = self.snapshot
+        return self.snapshot_name is not None and (snapshot.column, snapshot.model) == (slot.column, slot.model)
+
+    def _current(self) -> str | None:
+        """Name of the published snapshot directory, if any."""
+
+        try:
+            with open(os.path.join(self.path, "CURRENT"), "r", encoding="utf-8") as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def load(self) -> bool:
+        """
+        Open the published snapshot from disk, memory-mapped.
+
+        Returns:
+            bool: True if a snapshot was found and loaded.
+        """
+
+        # Retry if the snapshot is replaced and pruned while being opened
+        for _ in range(3):
+            name = self._current()
+            if name is None:
+                return False
+            if name == self.snapshot_name:
+                return True
+            directory = os.path.join(self.path, name)
+            try:
+                with open(os.path.join(directory, "meta.json"), "r", encoding="utf-8") as f:
+                    meta = json.load(f)
+
+                # Map arrays without copying them into process memory
+                ids = np.load(os.path.join(directory, "ids.npy"), mmap_mode="r")
+                vectors = np.load(os.path.join(directory, "vectors.npy"), mmap_mode="r")
+                sq_norms = np.load(os.path.join(directory, "sq_norms.npy"), mmap_mode="r")
+            except FileNotFoundError:
+                continue
+            self.snapshot = Snapshot(
+                ids, vectors, sq_norms, meta["watermark"],
+                meta.get("column", "embedding"), meta.get("model"), meta.get("generation"), meta.get("deleted")
+            )
+            self.snapshot_name = name
+            return True
+        return False
+
+    def save(self, *parts: Snapshot) -> None:
+        """
+        Persist the concatenation of snapshots to its own directory and publish it atomically.
+
+        Arrays are streamed part by part into preallocated files, so appending to
+        a memory-mapped snapshot never copies it into process memory. Metadata is
+        taken from the last part.
+
+        Args:
+            *parts (Snapshot):
+                Index contents to persist, in order, e.g. the current snapshot and the rows added since.
+        """
+
+        # Preallocate arrays in a directory unique to this writer
+        last = parts[-1]
+        size = sum(len(part.ids) for part in parts)
+        name = f"snap-{last.watermark}-{os.getpid()}-{time.time_ns()}"
+        directory = os.path.join(self.path, name)
+        os.makedirs(directory)
+        ids = open_memmap(os.path.join(directory, "ids.npy"), mode="w+", dtype=np.int64, shape=(size,))
+        vectors = open_memmap(
+            os.path.join(directory, "vectors.npy"), mode="w+", dtype=np.float32, shape=(size, last.vectors.shape[1])
+        )
+        sq_norms = open_memmap(os.path.join(directory, "sq_norms.npy"), mode="w+", dtype=np.float32, shape=(size,))
+
+        # Copy each part in chunks, reusing the norms already computed
+        start = 0
+        for part in parts:
+            for i in range(0, len(part.ids), ANN_CHUNK_ROWS):
+                j = min(i + ANN_CHUNK_ROWS, len(part.ids))
+                ids[start + i:start + j] = part.ids[i:j]
+                vectors[start + i:start + j] = part.vectors[i:j]
+                sq_norms[start + i:start + j] = part.sq_norms[i:j]
+            start += len(part.ids)
+        for array in (ids, vectors, sq_norms):
+            array.flush()
+        del ids, vectors, sq_norms
+        with open(os.path.join(directory, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({
+                "watermark": last.watermark,
+                "size": size,
+                "column": last.column,
+                "model": last.model,
+                "generation": last.generation,
+                "deleted": last.deleted,
+            }, f)
+
+        # Publish by replacing the pointer file in one rename
+        tmp = os.path.join(self.path, f"CURRENT.{name}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(name)
+        os.replace(tmp, os.path.join(self.path, "CURRENT"))
+
+        # Prune older snapshots; processes already mapping them keep their pages
+        for entry in os.listdir(self.path):
+            if entry.startswith("snap-") and entry != name:
+                shutil.rmtree(os.path.join(self.path, entry), ignore_errors=True)
+
+        # Reopen the published snapshot memory-mapped
+        self.load()
+
+    @contextmanager
+    def _writer_lock(self, block: bool = True):
+        """
+        Hold an exclusive file lock so only one process refreshes the shared snapshot at a time.
+
+        Args:
+            block (bool, optional):
+                Wait for the lock, rather than yield False when another process holds it (default: True).
+        """
+
+        os.makedirs(self.path, exist_ok=True)
+        with open(os.path.join(self.path, ".lock"), "a") as f:
+            try:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_EX if block else fcntl.LOCK_EX | fcntl.LOCK_NB)
+                locked = True
+            except BlockingIOError:
+                locked = False
+            try:
+                yield locked
+            finally:
+                if locked and fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def build(self, session, slot: EmbeddingSlot | None = None) -> None:
+        """
+        Build the index from scratch out of the documents table.
+
+        Args:
+            session (sqlalchemy.orm.Session):
+                Active SQLAlchemy session bound to PostgreSQL.
+            slot (EmbeddingSlot, optional):
+                Embedding slot to index (default: None, the active slot).
+        """
+
+        slot = slot or get_active_slot(session)
+        with self._writer_lock():
+            empty = _empty_snapshot(slot.dim, slot.column, slot.model, table_state(session))
+            self.save(empty, self._rows_since(session, empty))
+        self.refreshed_at = time.monotonic()
+
+    def refresh(self, session, slot: EmbeddingSlot | None = None, block: bool = True) -> None:
+        """
+        Bring the index up to date incrementally using the id watermark.
+
+        Rows inserted since the last refresh are appended. The index is rebuilt
+        when the table was truncated (e.g. by a re-upload, even one reusing the
+        same ids), rows were deleted, or search was cut over to another embedding
+        model. A snapshot published by another process in the meantime is picked
+        up first.
+
+        Args:
+            session (sqlalchemy.orm.Session):
+                Active SQLAlchemy session bound to PostgreSQL.
+            slot (EmbeddingSlot, optional):
+                Embedding slot to index (default: None, the active slot).
+            block (bool, optional):
+                Wait for another process refreshing the snapshot, rather than only load
+                the latest published one (default: True).
+        """
+
+        slot = slot or get_active_slot(session)
+        with self._writer_lock(block) as locked:
+            # Start from the latest published snapshot
+            self.load()
+            snapshot = self.snapshot
+
+            # Compare indexed rows with table state, unless another process is refreshing
+            if locked:
+                state = table_state(session)
+
+                # Rebuild after a truncation, deletions or a cutover, otherwise append new rows only
+                cutover = (slot.column, slot.model) != (snapshot.column, snapshot.model)
+                if cutover or state.requires_rebuild(snapshot.watermark, snapshot.generation, snapshot.deleted):
+                    empty = _empty_snapshot(slot.dim, slot.column, slot.model, state)
+                    self.save(empty, self._rows_since(session, empty))
+                elif state.max_id > snapshot.watermark:
+                    self.save(snapshot, self._rows_since(session, snapshot))
+        self.refreshed_at = time.monotonic()
+
+    def search(
+        self,
+        query_embedding: np.ndarray,
+        limit: int,
+        after: tuple[float, int] | None = None,
+        epsilon: float = 0.0
+    ) -> list[tuple[int, float]]:
+        """
+        Find the closest documents to a query embedding.
+
+        Args:
+            query_embedding (np.ndarray):
+                Query embedding of shape (dim,), from the model the index was built with.
+            limit (int):
+                Maximum number of results to return.
+            after (tuple[float, int], optional):
+                Keyset cursor, score and id of the last result already seen (default: None).
+            epsilon (float, optional):
+                Tolerated error of the cursor and returned scores against another scorer. When positive,
+                every document that may rank in the top results under that scorer is returned, possibly
+                more than limit (default: 0.0, exactly the top results by the index's own scores).
+
+        Returns:
+            list[tuple[int, float]]: Document ids with their similarity score, best first.
+        """
+
+        # Read the snapshot once, so a concurrent refresh cannot mix arrays
+        snapshot = self.snapshot
+        if len(snapshot.ids) == 0 or limit <= 0:
+            return []
+
+        # Compute L2 distances as ||x||^2 - 2 x.q + ||q||^2
+        q = np.asarray(query_embedding, dtype=np.float32)
+        sq_dist = snapshot.sq_norms - 2.0 * (snapshot.vectors @ q) + float(q @ q)
+        scores = 1.0 - np.sqrt(np.maximum(sq_dist, 0.0))
+        if not epsilon:
+            top = _select(scores, snapshot.ids, limit, after)
+            return [(int(snapshot.ids[i]), float(scores[i])) for i in top]
+
+        # Narrow down on float32 scores, then rescore the few remaining rows in float64
+        top = _select(scores, snapshot.ids, limit, after, ANN_COARSE_EPSILON)
+        diff = np.asarray(snapshot.vectors[top], dtype=np.float64) - q.astype(np.float64)
+        exact = 1.0 - np.sqrt(np.einsum("ij,ij->i", diff, diff))
+        ids = snapshot.ids[top]
+        return [(int(ids[i]), float(exact[i])) for i in _select(exact, ids, limit, after, epsilon)]
+
+    def _rows_since(self, session, snapshot: Snapshot) -> Snapshot:
+        """Return a snapshot of only the rows above the snapshot's watermark, with its metadata."""
+
+        sql = text(f"""
+            SELECT id, {snapshot.column} AS embedding
+            FROM documents
+            WHERE id > :w AND {snapshot.column} IS NOT NULL
+            ORDER BY id
+            LIMIT :limit
+        """).columns(id=Integer, embedding=Vector())
+
+        # Fetch new rows in id order, a chunk per round trip
+        ids, vectors = [snapshot.ids[:0]], [snapshot.vectors[:0]]
+        watermark = snapshot.watermark
+        while True:
+            rows = session.execute(sql, {"w": watermark, "limit": ANN_CHUNK_ROWS}).fetchall()
+            if not rows:
+                break
+            ids.append(np.fromiter((r.id for r in rows), dtype=np.int64, count=len(rows)))
+            vectors.append(np.vstack([np.asarray(r.embedding, dtype=np.float32) for r in rows]))
+            watermark = rows[-1].id
+
+        # Stack the new rows only, computing their norms once
+        ids, vectors = np.concatenate(ids), np.vstack(vectors)
+        return Snapshot(
+            ids, vectors, np.einsum("ij,ij->i", vectors, vectors),
+            watermark, snapshot.column, snapshot.model, snapshot.generation, snapshot.deleted
+        )
+
+
+def _select(
+    scores: np.ndarray,
+    ids: np.ndarray,
+    limit: int,
+    after: tuple[float, int] | None = None,
+    epsilon: float = 0.0
+) -> np.ndarray:
+    """
+    Select the top results ranked after a cursor in (score DESC, id ASC) order, without sorting the whole corpus.
+
+    Every result tied with the last one selected is considered, so ties are broken by
+    id as the cursor expects. With a positive epsilon, scores may be off by up to
+    epsilon, and every result that may rank in the top ones is kept, unsliced.
+
+    Args:
+        scores (np.ndarray):
+            Similarity score of each result.
+        ids (np.ndarray):
+            Document id of each result.
+        limit (int):
+            Number of top results to select.
+        after (tuple[float, int], optional):
+            Keyset cursor, score and id of the last result already seen (default: None).
+        epsilon (float, optional):
+            Maximum error of the scores (default: 0.0, exact).
+
+    Returns:
+        np.ndarray: Positions of the selected results, best first.
+    """
+
+    # Keep results that may rank after the cursor, and note those that surely do
+    candidates = np.arange(len(ids))
+    sure = candidates
+    if after is not None:
+        after_score, after_id = after
+        if epsilon:
+            candidates = candidates[scores <= after_score + epsilon]
+            sure = candidates[scores[candidates] < after_score - epsilon]
+        else:
+            candidates = candidates[(scores < after_score) | ((scores == after_score) & (ids > after_id))]
+            sure = candidates
+
+    # Keep every result that may score as high as the k-th best one surely after the cursor
+    k = min(limit, len(sure))
+    if k > 0:
+        kth = -np.partition(-scores[sure], k - 1)[k - 1]
+        candidates = candidates[scores[candidates] >= kth - 2 * epsilon]
+    candidates = candidates[np.lexsort((ids[candidates], -scores[candidates]))]
+    return candidates if epsilon else candidates[:limit]
+
+
+def _refresh_in_background(index: FlatIndex, slot: EmbeddingSlot) -> None:
+    """Refresh the index on its own session, off the request path and on a replica when configured."""
+
+    try:
+        with get_read_session() as session, timed("ann_refresh"):
+            index.refresh(session, slot, block=False)
+    finally:
+        # Wait a full interval before retrying a failed refresh
+        index.refreshed_at = time.monotonic()
+
+
+def _start_refresh(index: FlatIndex, slot: EmbeddingSlot) -> None:
+    """Start a background refresh, unless one is already running. Requires _INDEX_LOCK."""
+
+    global _REFRESH_THREAD
+    if _REFRESH_THREAD is not None and _REFRESH_THREAD.is_alive():
+        return
+    _REFRESH_THREAD = threading.Thread(
+        target=_refresh_in_background, args=(index, slot), name="ann-refresh", daemon=True
+    )
+    _REFRESH_THREAD.start()
+
+
+def request_refresh(slot: EmbeddingSlot) -> None:
+    """
+    Refresh the in-process index in the background without waiting for the refresh interval.
+
+    Args:
+        slot (EmbeddingSlot):
+            Embedding slot serving search.
+    """
+
+    with _INDEX_LOCK:
+        if _INDEX is not None:
+            _start_refresh(_INDEX, slot)
+
+
+def get_index(session, slot: EmbeddingSlot | None = None) -> FlatIndex | None:
+    """
+    Retrieve the in-process index, refreshing it in the background when necessary.
+
+    Searches never wait for a refresh: they keep using the current snapshot while
+    the next one is built, and fall back to pgvector until a snapshot of the slot
+    serving search exists (e.g. on a cold start, or right after a cutover). A
+    snapshot of a truncated table is detected when fetching its results instead.
+
+    Args:
+        session (sqlalchemy.orm.Session):
+            Active SQLAlchemy session bound to PostgreSQL.
+        slot (EmbeddingSlot, optional):
+            Embedding slot serving search (default: None, the cached active slot).
+
+    Returns:
+        FlatIndex | None: A ready-to-use index, or None when ANN_INDEX_DIR is unset or no snapshot is ready.
+    """
+
+    global _INDEX
+    if not ANN_INDEX_DIR:
+        return None
+    slot = slot or cached_active_slot(session)
+    with _INDEX_LOCK:
+        if _INDEX is None:
+            _INDEX = FlatIndex(ANN_INDEX_DIR)
+            _INDEX.load()
+
+        # Start a refresh when due, unless one is already running
+        if time.monotonic() - _INDEX.refreshed_at >= ANN_REFRESH_SECONDS or not _INDEX.serves(slot):
+            _start_refresh(_INDEX, slot)
+        index = _INDEX
+    return index if index.serves(slot) else None
+
+
+if __name__ == "__main__":
+    if not ANN_INDEX_DIR:
+        raise RuntimeError("ANN_INDEX_DIR environment variable is required to build the index.")
+    with get_session() as session:
+        index = FlatIndex(ANN_INDEX_DIR)
+        index.build(session)
+    print(f"Indexed {len(index)} documents to '{ANN_INDEX_DIR}'")
@@ -1,7 +1,42 @@
 import spacy
+from functools import partial
+from typing import NamedTuple
 from sqlalchemy import text
 from src.models.document import Document
 from src.ingestion.embedding import embed_text
+from src.ingestion.versioning import EmbeddingSlot, cached_active_slot
+from src.retrieval.ann import ANN_SCORE_EPSILON, get_index, request_refresh
+from src.retrieval.synonyms import SYNONYM_MAX_TERMS, get_vocabulary
+from src.metrics import timed, timed_query, MODEL_LOADS
+
+
+class SearchHit(NamedTuple):
+    """Lightweight search result row, avoiding ORM instrumentation on every hit."""
+
+    id: int
+    title: str | None
+    content: str
+    score: float
+
+    def to_document(self) -> tuple[Document, float]:
+        """Adapt the hit to the legacy (Document, score) result shape."""
+
+        return Document(id=self.id, title=self.title, content=self.content), self.score
+
+
+def to_documents(hits: list[SearchHit]) -> list[tuple[Document, float]]:
+    """
+    Adapt search hits to the legacy (Document, score) result shape for existing callers.
+
+    Args:
+        hits (list[SearchHit]):
+            Results returned by any search function.
+
+    Returns:
+        list[tuple[Document, float]]: Transient ORM documents with their similarity score.
+    """
+
+    return [hit.to_document() for hit in hits]
 
 
 # Initialize language model for synonym expansion
@@ -19,12 +54,46 @@ def get_nlp():
             from spacy.cli import download
             download("en_core_web_md")
             nlp = spacy.load("en_core_web_md", disable=["ner", "parser", "tagger"])
+        MODEL_LOADS.inc(model="spacy")
     return nlp
 
 
-def vector_search(session, query: str, limit: int = 5) -> list[tuple[Document, float]]:
+def _keyset(score_expr: str, after: tuple[float, int] | None) -> tuple[str, dict]:
     """
-    Perform semantic similarity search using MiniLM embeddings and pgvector.
+    Build the keyset pagination predicate for results ordered by (score DESC, id ASC).
+
+    Args:
+        score_expr (str):
+            SQL expression computing the score.
+        after (tuple[float, int] | None):
+            Score and id of the last result on the previous page.
+
+    Returns:
+        tuple[str, dict]: Condition (TRUE on the first page) and its bind parameters.
+    """
+
+    if after is None:
+        return "TRUE", {}
+    condition = f"(({score_expr}) < :after_score OR (({score_expr}) = :after_score AND id > :after_id))"
+    return condition, {"after_score": after[0], "after_id": after[1]}
+
+
+def _content_column(snippet: int | None) -> str:
+    """Select full content, or only its first `snippet` characters to avoid transferring it."""
+
+    return "content" if snippet is None else "LEFT(content, :snippet) AS content"
+
+
+def vector_search(
+    session,
+    query: str,
+    limit: int = 5,
+    after: tuple[float, int] | None = None,
+    snippet: int | None = None,
+    slot: EmbeddingSlot | None = None
+) -> list[SearchHit]:
+    """
+    Perform semantic similarity search using the active embedding model (MiniLM by default) and pgvector.
 
     Args:
         session (sqlalchemy.orm.Session):
@@ -33,37 +102,137 @@ def vector_search(session, query: str, limit: int = 5) -> list[tuple[Document, f
             Text query to search.
         limit (int, optional):
             Maximum number of results to return (default: 5).
+        after (tuple[float, int], optional):
+            Keyset cursor, score and id of the last result already seen (default: None).
+        snippet (int, optional):
+            Truncate content to this many characters (default: None, full content).
+        slot (EmbeddingSlot, optional):
+            Embedding slot to search, e.g. pinned across pages (default: None, the cached active slot).
 
     Returns:
-        list[tuple[Document, float]]: Closest documents in vector space with their similarity score.
+        list[SearchHit]: Closest documents in vector space with their similarity score.
     """
 
-    # Embed query with MiniLM
-    query_embedding = embed_text(query.lower()).tolist()
-
-    # Prepare query with HNSW index accelerating the pgvector cosine distance operator
-    sql = text("""
+    # Embed query with the model of the embedding slot serving search
+    slot = slot or cached_active_slot(session)
+    query_embedding = embed_text(query.lower(), model_name=slot.model)
+
+    # Serve from the in-process index when enabled, fetching only the winning rows
+    index = get_index(session, slot)
+    if index is not None:
+        hits = _index_search(session, index, query_embedding, limit, after=after, snippet=snippet)
+        if hits is not None:
+            return hits
+
+        # The snapshot predates a truncation (e.g. a re-upload), so its ids name other rows now
+        request_refresh(slot)
+
+    # Prepare query with HNSW index accelerating the pgvector cosine distance operator,
+    # skipping rows not embedded in the slot (e.g. inserted into the next slot after a cutover)
+    score_expr = f"1 - ({slot.column} <-> CAST(:q AS vector))"
+    keyset, params = _keyset(score_expr, after)
+    sql = text(f"""
         SELECT 
             id,
             title,
-            content,
-            1 - (embedding <-> CAST(:q AS vector)) AS score
+            {_content_column(snippet)},
+            {score_expr} AS score
         FROM documents
-        ORDER BY score DESC
+        WHERE {slot.column} IS NOT NULL AND {keyset}
+        ORDER BY score DESC, id ASC
         LIMIT :limit
     """)
 
     # Execute query
-    rows = session.execute(sql, {"q": query_embedding, "limit": limit}).fetchall()
+    params.update({"q": query_embedding.tolist(), "limit": limit, "snippet": snippet})
+    rows = timed_query(session, sql, params, stage="sql_vector")
 
     # Return top results, filtering out non-positive scores
     return [
-        (Document(id=r.id, title=r.title, content=r.content), float(r.score))
+        SearchHit(r.id, r.title, r.content, float(r.score))
         for r in rows if float(r.score) > 0
     ]
 
 
-def fuzzy_search(session, query: str, limit: int = 5, threshold: float = 0.1) -> list[tuple[Document, float]]:
+def _index_search(
+    session,
+    index,
+    query_embedding,
+    limit: int,
+    after: tuple[float, int] | None = None,
+    snippet: int | None = None
+) -> list[SearchHit] | None:
+    """
+    Rank documents with the in-process index, then score and fetch the winners in PostgreSQL.
+
+    The index returns every candidate within ANN_SCORE_EPSILON of the top results,
+    and pgvector scores them exactly like vector_search, so cursors issued on either
+    path page correctly on the other.
+
+    Args:
+        session (sqlalchemy.orm.Session):
+            Active SQLAlchemy session bound to PostgreSQL.
+        index (src.retrieval.ann.FlatIndex):
+            Loaded in-process index.
+        query_embedding (np.ndarray):
+            Query embedding of shape (384,).
+        limit (int):
+            Maximum number of results to return.
+        after (tuple[float, int], optional):
+            Keyset cursor, score and id of the last result already seen (default: None).
+        snippet (int, optional):
+            Truncate content to this many characters (default: None, full content).
+
+    Returns:
+        list[SearchHit] | None: Closest documents in vector space with their similarity score,
+            or None when the index was built before the table was last truncated.
+    """
+
+    # Collect candidates that may rank in the top results once scored by pgvector
+    snapshot = index.snapshot
+    with timed("ann_search"):
+        candidates = [
+            doc_id for doc_id, _ in index.search(query_embedding, limit, after=after, epsilon=ANN_SCORE_EPSILON)
+        ]
+
+    # Score candidates by primary key and keep the winners, along with the table generation they belong to
+    score_expr = f"1 - ({snapshot.column} <-> CAST(:q AS vector))"
+    keyset, params = _keyset(score_expr, after)
+    rows = timed_query(
+        session,
+        text(f"""
+            SELECT g.generation, d.id, d.title, d.content, d.score
+            FROM (SELECT pg_relation_filenode('documents') AS generation) g
+            LEFT JOIN (
+                SELECT id, title, {_content_column(snippet)}, {score_expr} AS score
+                FROM documents
+                WHERE id = ANY(:ids) AND {snapshot.column} IS NOT NULL AND {keyset}
+                ORDER BY score DESC, id ASC
+                LIMIT :limit
+            ) d ON TRUE
+            ORDER BY d.score DESC, d.id ASC
+        """),
+        {**params, "ids": candidates, "q": query_embedding.tolist(), "limit": limit, "snippet": snippet},
+        stage="sql_fetch",
+    )
+    if rows[0].generation != snapshot.generation:
+        return None
+
+    # Return top results, skipping rows deleted since the last refresh and non-positive scores
+    return [
+        SearchHit(r.id, r.title, r.content, float(r.score))
+        for r in rows if r.id is not None and float(r.score) > 0
+    ]
+
+
+def fuzzy_search(
+    session,
+    query: str,
+    limit: int = 5,
+    threshold: float = 0.1,
+    after: tuple[float, int] | None = None,
+    snippet: int | None = None
+) -> list[SearchHit]:
     """
     Perform lexical search using pg_bigm.
 
@@ -76,37 +245,47 @@ def fuzzy_search(session, query: str, limit: int = 5, threshold: float = 0.1) ->
             Maximum number of results to return (default: 5).
         threshold (float, optional):
             Minimum similarity score (default: 0.1).
+        after (tuple[float, int], optional):
+            Keyset cursor, score and id of the last result already seen (default: None).
+        snippet (int, optional):
+            Truncate content to this many characters (default: None, full content).
 
     Returns:
-        list[tuple[Document, float]]: Closest documents in vector space with their similarity score.
+        list[SearchHit]: Closest documents in vector space with their similarity score.
     """
     
-    # Prepare query with GIN index accelerating the pg_bigm bigram distance operator
-    sql = text("""
+    # Prepare query with GIN index accelerating the pg_bigm bigram distance operator,
+    # widening the real score so the returned value compares exactly against the cursor
+    score_expr = "bigm_similarity(LOWER(content), :q)::float8"
+    keyset, params = _keyset(score_expr, after)
+    sql = text(f"""
         SELECT 
             id, 
             title, 
-            content,
-            bigm_similarity(LOWER(content), :q) AS score
+            {_content_column(snippet)},
+            {score_expr} AS score
         FROM documents
         -- WHERE LOWER(content) % :q
-        ORDER BY score DESC
+        WHERE {keyset}
+        ORDER BY score DESC, id ASC
         LIMIT :limit
     """)
 
     # Execute query
-    rows = session.execute(sql, {"q": query.lower(), "limit": limit}).fetchall()
+    params.update({"q": query.lower(), "limit": limit, "snippet": snippet})
+    rows = timed_query(session, sql, params, stage="sql_fuzzy")
 
     # Return top results, filtering out less than threshold scores
     return [
-        (Document(id=r.id, title=r.title, content=r.content), float(r.score))
+        SearchHit(r.id, r.title, r.content, float(r.score))
         for r in rows if float(r.score) >= threshold
     ]
 
 
-def _synonym_expansion(session, query: str, threshold: float) -> str:
+@timed("synonym_expansion")
+def synonym_expansion(session, query: str, threshold: float, max_terms: int | None = None) -> str:
     """
-    Expand query with synonyms from SpaCy vocabulary.
+    Expand query with at most max_terms synonyms from the corpus vocabulary.
 
     Args:
         session (sqlalchemy.orm.Session):
@@ -115,40 +294,36 @@ def _synonym_expansion(session, query: str, threshold: float) -> str:
             Text query to search.
         threshold (float):
             Similarity threshold for synonym inclusion.
+        max_terms (int, optional):
+            Maximum number of synonyms appended (default: None, SYNONYM_MAX_TERMS).
 
     Returns:
-        list[tuple[Document, float]]: Closest documents in vector space with their similarity score.
+        str: Query followed by its top-scoring synonyms.
     """
 
-    # Load language model
+    # Load language model and the cached corpus vocabulary
     nlp = get_nlp()
+    vocabulary = get_vocabulary(session, nlp)
 
-    # Vectorize query
-    query_vec = nlp.make_doc(query.lower())
-
-    # Fetch documents
-    docs = session.execute(text("SELECT content FROM documents")).fetchall()
-
-    # Initialize expanded terms
-    expanded_terms = []
-
-    # Iterate each row and add to expanded terms if surpass threshold
-    for row in docs:
-        doc_vec = nlp.make_doc(row.content)
-        for token in doc_vec:
-            similarity = token.similarity(query_vec)
-            if similarity >= threshold:
-                expanded_terms.append(token.text)
-
-    # Deduplicate and prepare expanded query
-    expanded_terms = list({t.lower() for t in expanded_terms})
-    query_expanded = " ".join([query, *expanded_terms])
+    # Select the top-scoring unique synonyms within the term budget
+    max_terms = SYNONYM_MAX_TERMS if max_terms is None else max_terms
+    expanded_terms = vocabulary.expand(query.lower(), threshold, max_terms)
 
     # Return expanded query
-    return query_expanded
-
-
-def synonym_vector_search(session, query: str, limit: int = 5, threshold: float = 0.3) -> list[tuple[Document, float]]:
+    return " ".join([query, *expanded_terms])
+
+
+def synonym_vector_search(
+    session,
+    query: str,
+    limit: int = 5,
+    threshold: float = 0.3,
+    after: tuple[float, int] | None = None,
+    snippet: int | None = None,
+    max_terms: int | None = None,
+    query_expanded: str | None = None,
+    slot: EmbeddingSlot | None = None
+) -> list[SearchHit]:
     """
     Perform synonym search using SpaCy similarity and pgvector.
 
@@ -161,19 +336,39 @@ def synonym_vector_search(session, query: str, limit: int = 5, threshold: float
             Maximum number of results to return (default: 5).
         threshold (float, optional):
             Similarity threshold for synonym inclusion (default: 0.3).
+        after (tuple[float, int], optional):
+            Keyset cursor, score and id of the last result already seen (default: None).
+        snippet (int, optional):
+            Truncate content to this many characters (default: None, full content).
+        max_terms (int, optional):
+            Maximum number of synonyms added to the query (default: None, SYNONYM_MAX_TERMS).
+        query_expanded (str, optional):
+            Query already expanded, e.g. carried in a pagination cursor (default: None, expand the query).
+        slot (EmbeddingSlot, optional):
+            Embedding slot to search, e.g. pinned across pages (default: None, the cached active slot).
 
     Returns:
-        list[tuple[Document, float]]: Closest documents in vector space with their similarity score.
+        list[SearchHit]: Closest documents in vector space with their similarity score.
     """
 
-    # Expand query with synonyms
-    query_expanded = _synonym_expansion(session, query, threshold)
+    # Expand query with synonyms, unless already expanded
+    if query_expanded is None:
+        query_expanded = synonym_expansion(session, query, threshold, max_terms)
 
     # Run vector search with expanded query
-    return vector_search(session, query_expanded, limit=limit)
-
-
-def synonym_fuzzy_search(session, query: str, limit: int = 5, threshold: float = 0.3) -> list[tuple[Document, float]]:
+    return vector_search(session, query_expanded, limit=limit, after=after, snippet=snippet, slot=slot)
+
+
+def synonym_fuzzy_search(
+    session,
+    query: str,
+    limit: int = 5,
+    threshold: float = 0.3,
+    after: tuple[float, int] | None = None,
+    snippet: int | None = None,
+    max_terms: int | None = None,
+    query_expanded: str | None = None
+) -> list[SearchHit]:
     """
     Perform synonym search using SpaCy similarity and pg_bigm.
 
@@ -186,13 +381,94 @@ def synonym_fuzzy_search(session, query: str, limit: int = 5, threshold: float =
             Maximum number of results to return (default: 5).
         threshold (float, optional):
             Similarity threshold for synonym inclusion (default: 0.3).
+        after (tuple[float, int], optional):
+            Keyset cursor, score and id of the last result already seen (default: None).
+        snippet (int, optional):
+            Truncate content to this many characters (default: None, full content).
+        max_terms (int, optional):
+            Maximum number of synonyms added to the query (default: None, SYNONYM_MAX_TERMS).
+        query_expanded (str, optional):
+            Query already expanded, e.g. carried in a pagination cursor (default: None, expand the query).
 
     Returns:
-        list[tuple[Document, float]]: Closest documents in vector space with their similarity score.
+        list[SearchHit]: Closest documents in vector space with their similarity score.
     """
 
-    # Expand query with synonyms
-    query_expanded = _synonym_expansion(session, query, threshold)
+    # Expand query with synonyms, unless already expanded
+    if query_expanded is None:
+        query_expanded = synonym_expansion(session, query, threshold, max_terms)
 
     # Run fuzzy search with expanded query
-    return fuzzy_search(session, query_expanded, limit=limit, threshold=threshold)
+    return fuzzy_search(
+        session, query_expanded, limit=limit, threshold=threshold, after=after, snippet=snippet
+    )
+
+
+def iter_synonym_search(
+    session,
+    query: str,
+    method: str = "vector",
+    limit: int = 5,
+    threshold: float = 0.3,
+    after: tuple[float, int] | None = None,
+    snippet: int | None = None,
+    page_size: int = 500,
+    max_terms: int | None = None,
+    query_expanded: str | None = None,
+    slot: EmbeddingSlot | None = None
+):
+    """
+    Lazily yield synonym search results page by page, keeping memory bounded by page_size.
+
+    The query is expanded and the embedding slot chosen once, then the underlying
+    search is paged with keyset cursors, so every page ranks the same query.
+
+    Args:
+        session (sqlalchemy.orm.Session):
+            Active SQLAlchemy session bound to PostgreSQL.
+        query (str):
+            Text query to search.
+        method (str, optional):
+            Either 'vector' or 'fuzzy' (default: 'vector').
+        limit (int, optional):
+            Maximum number of results to yield in total (default: 5).
+        threshold (float, optional):
+            Similarity threshold for synonym inclusion (default: 0.3).
+        after (tuple[float, int], optional):
+            Keyset cursor, score and id of the last result already seen (default: None).
+        snippet (int, optional):
+            Truncate content to this many characters (default: None, full content).
+        page_size (int, optional):
+            Number of rows fetched per round trip (default: 500).
+        max_terms (int, optional):
+            Maximum number of synonyms added to the query (default: None, SYNONYM_MAX_TERMS).
+        query_expanded (str, optional):
+            Query already expanded, e.g. carried in a pagination cursor (default: None, expand the query).
+        slot (EmbeddingSlot, optional):
+            Embedding slot to search, e.g. pinned across pages (default: None, the cached active slot).
+
+    Yields:
+        SearchHit: Closest documents with their similarity score, best first.
+    """
+
+    # Select underlying search method
+    if method == "vector":
+        search = partial(vector_search, slot=slot or cached_active_slot(session))
+    elif method == "fuzzy":
+        search = partial(fuzzy_search, threshold=threshold)
+    else:
+        raise ValueError("method must be 'vector' or 'fuzzy'")
+
+    # Expand query with synonyms once for all pages, unless already expanded
+    if query_expanded is None:
+        query_expanded = synonym_expansion(session, query, threshold, max_terms)
+
+    # Page through results until the limit is reached or results run out
+    remaining = limit
+    while remaining > 0:
+        page = search(session, query_expanded, limit=min(page_size, remaining), after=after, snippet=snippet)
+        yield from page
+        if len(page) < min(page_size, remaining):
+            return
+        remaining -= len(page)
+        after = (page[-1].score, page[-1].id)
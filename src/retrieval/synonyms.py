@@ -0,0 +1,267 @@
+# Environment imports
+import os
+from dotenv import load_dotenv
+load_dotenv()
+
+# Core imports
+import time
+import threading
+from collections import OrderedDict
+from typing import NamedTuple
+import numpy as np
+from sqlalchemy import text
+from src.db import get_read_session
+from src.metrics import timed, CACHE_HITS, CACHE_MISSES
+from src.retrieval.watermark import table_state
+
+# Expansion budget: default terms added per query, and synonyms cached per term (upper bound on the budget)
+SYNONYM_MAX_TERMS = int(os.getenv("SYNONYM_MAX_TERMS", "10"))
+SYNONYM_LIST_SIZE = int(os.getenv("SYNONYM_LIST_SIZE", "50"))
+
+# Cached synonym lists and vocabulary refresh interval
+SYNONYM_CACHE_SIZE = int(os.getenv("SYNONYM_CACHE_SIZE", "10000"))
+SYNONYM_REFRESH_SECONDS = float(os.getenv("SYNONYM_REFRESH_SECONDS", "10"))
+
+# Rows tokenized per round trip
+SYNONYM_CHUNK_ROWS = 10_000
+
+# Initialize module-level vocabulary singleton and its background refresh
+_VOCABULARY = None
+_VOCABULARY_LOCK = threading.Lock()
+_REFRESH_THREAD = None
+
+
+class VocabularySnapshot(NamedTuple):
+    """Corpus terms and their vectors, read up to an id watermark and versioned to tag synonym lists."""
+
+    terms: tuple[str, ...]
+    positions: dict[str, int]
+    vectors: np.ndarray
+    watermark: int
+    generation: int | None
+    deleted: int | None
+    version: int
+
+
+class CorpusVocabulary:
+    """
+    Unique corpus terms with unit-normalized SpaCy vectors, and per-term synonym lists.
+
+    Tokenizing the corpus happens once and is then kept up to date with an id
+    watermark, instead of on every query. Synonym lists hold the SYNONYM_LIST_SIZE
+    most similar corpus terms of a query term and are cached in an LRU, tagged
+    with the vocabulary version they were computed against.
+    """
+
+    def __init__(self, nlp):
+        self.nlp = nlp
+        self.snapshot = VocabularySnapshot((), {}, np.empty((0, nlp.vocab.vectors_length), dtype=np.float32), 0, None, None, 0)
+        self.refreshed_at = 0.0
+        self._synonyms: OrderedDict[str, tuple[int, list[tuple[str, float]]]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.snapshot.terms)
+
+    def refresh(self, session) -> None:
+        """
+        Bring the vocabulary up to date incrementally using the id watermark.
+
+        Terms of rows inserted since the last refresh are added. If the table was
+        truncated (e.g. by a re-upload, even one reusing the same ids) or rows were
+        removed, the vocabulary is rebuilt so terms of deleted documents go away.
+        Expansions keep reading the previous snapshot until the new one is assigned.
+
+        Args:
+            session (sqlalchemy.orm.Session):
+                Active SQLAlchemy session bound to PostgreSQL.
+        """
+
+        with self._refresh_lock:
+            # Compare tokenized rows with table state
+            snapshot = self.snapshot
+            state = table_state(session)
+
+            # Rebuild after a truncation or deletions, otherwise tokenize new rows only
+            if state.requires_rebuild(snapshot.watermark, snapshot.generation, snapshot.deleted):
+                empty = VocabularySnapshot((), {}, snapshot.vectors[:0], 0, state.generation, state.deleted, snapshot.version)
+                self.snapshot = self._add_since(session, empty, force=True)
+            elif state.max_id > snapshot.watermark:
+                self.snapshot = self._add_since(session, snapshot)
+            self.refreshed_at = time.monotonic()
+
+            # Drop synonym lists computed against a previous vocabulary
+            if self.snapshot.version != snapshot.version:
+                with self._lock:
+                    self._synonyms.clear()
+
+    def _add_since(self, session, snapshot: VocabularySnapshot, force: bool = False) -> VocabularySnapshot:
+        """Return a new snapshot with unseen terms from rows above the snapshot's watermark added."""
+
+        sql = text("SELECT id, content FROM documents WHERE id > :w ORDER BY id LIMIT :limit")
+
+        # Collect new alphabetic terms that have a word vector, on copies of the current state,
+        # fetching new rows in id order a chunk per round trip
+        positions = dict(snapshot.positions)
+        new_terms = []
+        watermark = snapshot.watermark
+        while True:
+            rows = session.execute(sql, {"w": watermark, "limit": SYNONYM_CHUNK_ROWS}).fetchall()
+            if not rows:
+                break
+            for r in rows:
+                for token in self.nlp.make_doc(r.content):
+                    term = token.lower_
+                    if term in positions or not token.is_alpha or not self.nlp.vocab[term].has_vector:
+                        continue
+                    positions[term] = len(snapshot.terms) + len(new_terms)
+                    new_terms.append(term)
+            watermark = rows[-1].id
+        if watermark == snapshot.watermark and not force:
+            return snapshot
+
+        # Stack unit-normalized vectors, so dot products are cosine similarities
+        vectors = snapshot.vectors
+        if new_terms:
+            added = np.vstack([self.nlp.vocab[t].vector for t in new_terms]).astype(np.float32)
+            norms = np.linalg.norm(added, axis=1, keepdims=True)
+            vectors = np.vstack([vectors, added / np.maximum(norms, 1e-12)])
+        return VocabularySnapshot(
+            (*snapshot.terms, *new_terms), positions, vectors,
+            watermark, snapshot.generation, snapshot.deleted, snapshot.version + 1
+        )
+
+    def synonyms(self, term: str) -> list[tuple[str, float]]:
+        """
+        Return the corpus terms most similar to a term, cached per term.
+
+        Args:
+            term (str):
+                Lowercased query term.
+
+        Returns:
+            list[tuple[str, float]]: Up to SYNONYM_LIST_SIZE terms with their cosine similarity, best first.
+        """
+
+        # Score against one snapshot, even if a refresh assigns the next one meanwhile
+        snapshot = self.snapshot
+
+        # Serve from the LRU cache when computed against this vocabulary version
+        with self._lock:
+            cached = self._synonyms.get(term)
+            if cached is not None and cached[0] == snapshot.version:
+                self._synonyms.move_to_end(term)
+                CACHE_HITS.inc(cache="synonym")
+                return cached[1]
+        CACHE_MISSES.inc(cache="synonym")
+
+        # Score the vocabulary and keep the top terms without sorting it all
+        lexeme = self.nlp.vocab[term]
+        result = []
+        if lexeme.has_vector and len(snapshot.terms) > 0:
+            q = lexeme.vector / max(float(np.linalg.norm(lexeme.vector)), 1e-12)
+            scores = snapshot.vectors @ q
+            k = min(SYNONYM_LIST_SIZE, len(scores))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top], kind="stable")]
+            result = [(snapshot.terms[i], float(scores[i])) for i in top]
+
+        # Store tagged with its version unless the vocabulary moved on, evicting the least recently used list
+        with self._lock:
+            if snapshot.version == self.snapshot.version:
+                self._synonyms[term] = (snapshot.version, result)
+                self._synonyms.move_to_end(term)
+                if len(self._synonyms) > SYNONYM_CACHE_SIZE:
+                    self._synonyms.popitem(last=False)
+        return result
+
+    def expand(self, query: str, threshold: float, max_terms: int = SYNONYM_MAX_TERMS) -> list[str]:
+        """
+        Select the top-scoring unique synonyms of a query's terms.
+
+        A candidate scores its best similarity to any query term. Since max_terms
+        never exceeds SYNONYM_LIST_SIZE, merging the per-term lists yields the
+        exact top terms over the whole vocabulary.
+
+        Args:
+            query (str):
+                Text query to expand.
+            threshold (float):
+                Minimum similarity for a synonym to be included.
+            max_terms (int, optional):
+                Maximum number of terms returned (default: SYNONYM_MAX_TERMS).
+
+        Returns:
+            list[str]: At most max_terms synonyms not already in the query, best first.
+        """
+
+        # Tokenize query into unique lowercased terms
+        query_terms = list(dict.fromkeys(t.lower_ for t in self.nlp.make_doc(query) if t.is_alpha))
+
+        # Keep the best score of each candidate over all query terms
+        candidates: dict[str, float] = {}
+        for term in query_terms:
+            for synonym, score in self.synonyms(term):
+                if score < threshold:
+                    break
+                if synonym not in query_terms and score > candidates.get(synonym, -1.0):
+                    candidates[synonym] = score
+
+        # Return the top candidates, breaking ties alphabetically for stable queries
+        ranked = sorted(candidates.items(), key=lambda kv: (-kv[1], kv[0]))
+        return [term for term, _ in ranked[:min(max_terms, SYNONYM_LIST_SIZE)]]
+
+
+def _refresh_in_background(vocabulary: CorpusVocabulary) -> None:
+    """Refresh the vocabulary off the request path, reading from a caught-up replica when configured."""
+
+    try:
+        with get_read_session() as session, timed("synonym_refresh"):
+            vocabulary.refresh(session)
+    finally:
+        # Wait a full interval before retrying a failed refresh
+        vocabulary.refreshed_at = time.monotonic()
+
+
+def get_vocabulary(session, nlp, wait: bool = False) -> CorpusVocabulary:
+    """
+    Retrieve the corpus vocabulary, building it on first use and refreshing it in the background.
+
+    Only the first build is waited for, so no query is expanded against an empty
+    vocabulary on a cold start. Later expansions keep using the current snapshot
+    while the next one is built.
+
+    Args:
+        session (sqlalchemy.orm.Session):
+            Active SQLAlchemy session bound to PostgreSQL.
+        nlp (spacy.Language):
+            Loaded SpaCy pipeline with word vectors.
+        wait (bool, optional):
+            Refresh on the given session and wait for it, e.g. to warm up before serving (default: False).
+
+    Returns:
+        CorpusVocabulary: The current vocabulary.
+    """
+
+    global _VOCABULARY, _REFRESH_THREAD
+    with _VOCABULARY_LOCK:
+        if _VOCABULARY is None or _VOCABULARY.nlp is not nlp:
+            _VOCABULARY = CorpusVocabulary(nlp)
+        vocabulary = _VOCABULARY
+        built = vocabulary.snapshot.generation is not None
+
+        # Start a refresh when due, unless one is already running or the vocabulary is built below
+        stale = time.monotonic() - vocabulary.refreshed_at >= SYNONYM_REFRESH_SECONDS
+        running = _REFRESH_THREAD is not None and _REFRESH_THREAD.is_alive()
+        if built and stale and not running and not wait:
+            _REFRESH_THREAD = threading.Thread(
+                target=_refresh_in_background, args=(vocabulary,), name="synonym-refresh", daemon=True
+            )
+            _REFRESH_THREAD.start()
+
+    # Build on the calling session, outside the global lock; concurrent first callers queue on the refresh
+    if wait or not built:
+        with timed("synonym_refresh"):
+            vocabulary.refresh(session)
+    return vocabulary
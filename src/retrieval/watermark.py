@@ -0,0 +1,57 @@
+from typing import NamedTuple
+from sqlalchemy import text
+
+
+class TableState(NamedTuple):
+    """Highest id of the documents table, its physical file and its cumulative count of deleted rows."""
+
+    max_id: int
+    generation: int
+    deleted: int
+
+    def requires_rebuild(self, watermark: int, generation: int | None, deleted: int | None) -> bool:
+        """
+        Whether rows read up to a watermark no longer match the table, so appending newer rows is not enough.
+
+        The physical file changes when the table is truncated (e.g. by a re-upload,
+        even one reusing the same ids), and the deleted count grows when rows are
+        deleted. The count comes from the statistics collector, so a deletion may
+        only be noticed by a later refresh.
+
+        Args:
+            watermark (int):
+                Highest id read so far.
+            generation (int | None):
+                Physical file the rows were read from.
+            deleted (int | None):
+                Deleted count when the rows were read.
+
+        Returns:
+            bool: True if the rows must be read again from scratch.
+        """
+
+        return self.generation != generation or self.deleted != deleted or self.max_id < watermark
+
+
+def table_state(session) -> TableState:
+    """
+    Read the change signals of the documents table, without scanning it.
+
+    The highest id comes from the primary key index, and the physical file and
+    deleted count from the catalog and statistics collector.
+
+    Args:
+        session (sqlalchemy.orm.Session):
+            Active SQLAlchemy session bound to PostgreSQL.
+
+    Returns:
+        TableState: Highest id, physical file and deleted count of the table.
+    """
+
+    row = session.execute(text("""
+        SELECT
+            (SELECT COALESCE(MAX(id), 0) FROM documents) AS max_id,
+            pg_relation_filenode('documents') AS generation,
+            pg_stat_get_tuples_deleted('documents'::regclass) AS deleted
+    """)).one()
+    return TableState(row.max_id, row.generation, row.deleted)
@@ -1,6 +1,10 @@
+import json
 from src.db import get_session
 from src.models.document import Document
-from src.ingestion.store import add_document, ingest_document
+from src.ingestion.store import add_document, ingest_document, ingest_documents
+import src.ingestion.bulk as bulk
+from src.ingestion.bulk import bulk_ingest, read_checkpoint, read_committed
+from src.ingestion.versioning import get_active_slot
 
 
 class TestEmbeddingIngestion:
@@ -28,3 +32,63 @@ class TestEmbeddingIngestion:
             assert doc.id is not None
             assert doc.embedding is not None
             assert len(doc.embedding) == 384
+
+
+    def test_ingest_documents_batch(self):
+        """Confirm batched ingestion: one bulk insert with MiniLM embeddings for every row."""
+        titles = ["Batch A", "Batch B"]
+        contents = ["First batched document", "Second batched document"]
+        with get_session() as session:
+            count = ingest_documents(session, titles, contents)
+            rows = session.query(Document).filter(Document.title.in_(titles)).all()
+            assert count == 2
+            assert len(rows) >= 2
+            assert all(len(row.embedding) == 384 for row in rows)
+
+    def test_bulk_ingest_resume(self, tmp_path):
+        """Confirm offline bulk ingestion skips the resume offset and checkpoints committed rows."""
+        source = tmp_path / "docs.csv"
+        source.write_text("title,content\n" + "".join(f"Bulk {i},Bulk document number {i}\n" for i in range(10)))
+        checkpoint = tmp_path / "checkpoint.json"
+        count = bulk_ingest(str(source), batch_size=3, workers=2, offset=4, checkpoint=str(checkpoint))
+        assert count == 6
+        assert json.loads(checkpoint.read_text())["offset"] == 10
+
+    def test_bulk_ingest_failure_resume(self, tmp_path, monkeypatch):
+        """Confirm batches committed around a failed batch are checkpointed and not ingested again on resume."""
+        source = tmp_path / "docs.csv"
+        source.write_text("title,content\n" + "".join(f"Bulk {i},Row {i}\n" for i in range(12)))
+        checkpoint = tmp_path / "checkpoint.json"
+        inserted = []
+
+        # Fail the second batch, inserting the others
+        def flaky_batch(batch):
+            if batch[0][1] == "Row 3":
+                raise RuntimeError("batch failed")
+            inserted.extend(content for _, content in batch)
+            return len(batch)
+
+        monkeypatch.setattr(bulk, "_ingest_batch", flaky_batch)
+        try:
+            bulk_ingest(str(source), batch_size=3, workers=1, checkpoint=str(checkpoint))
+        except RuntimeError:
+            pass
+        assert read_checkpoint(str(checkpoint), str(source)) == 3
+
+        # Resume with another batch size, skipping everything already committed
+        monkeypatch.setattr(bulk, "_ingest_batch", lambda batch: inserted.extend(c for _, c in batch) or len(batch))
+        bulk_ingest(
+            str(source), batch_size=4, workers=2, checkpoint=str(checkpoint),
+            offset=read_checkpoint(str(checkpoint), str(source)),
+            committed=read_committed(str(checkpoint), str(source)),
+        )
+        assert sorted(inserted) == sorted(f"Row {i}" for i in range(12))
+        assert read_checkpoint(str(checkpoint), str(source)) == 12
+
+    def test_ingest_tags_active_model(self):
+        """Confirm ingestion writes the active embedding slot and tags rows with its model."""
+        with get_session() as session:
+            slot = get_active_slot(session)
+            doc = ingest_document(session, "Versioned", "Document embedded by the active model")
+            assert getattr(doc, slot.model_column) == slot.model
+            assert getattr(doc, slot.column) is not None
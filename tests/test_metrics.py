@@ -0,0 +1,35 @@
+from src.metrics import Counter, Histogram, timed, start_request_timing, server_timing_header
+
+
+class TestMetrics:
+    def test_histogram_render(self):
+        """Confirm histogram buckets are cumulative and rendered in Prometheus format."""
+        hist = Histogram("test_seconds", "Test histogram.", buckets=(0.1, 1.0))
+        hist.observe(0.05, stage="a")
+        hist.observe(0.5, stage="a")
+        hist.observe(5.0, stage="a")
+        lines = hist.render()
+        assert 'test_seconds_bucket{stage="a",le="0.1"} 1' in lines
+        assert 'test_seconds_bucket{stage="a",le="1.0"} 2' in lines
+        assert 'test_seconds_bucket{stage="a",le="+Inf"} 3' in lines
+        assert 'test_seconds_count{stage="a"} 3' in lines
+
+    def test_counter_render(self):
+        """Confirm counters accumulate per label set."""
+        counter = Counter("test_total", "Test counter.")
+        counter.inc(cache="model")
+        counter.inc(2, cache="model")
+        assert 'test_total{cache="model"} 3' in counter.render()
+
+    def test_server_timing(self):
+        """Confirm stage timings of the current request are aggregated into a Server-Timing value."""
+        start_request_timing()
+        with timed("embed"):
+            pass
+        with timed("embed"):
+            pass
+        with timed("sql_vector"):
+            pass
+        header = server_timing_header()
+        assert header.startswith("embed;dur=")
+        assert ", sql_vector;dur=" in header
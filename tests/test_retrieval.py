@@ -1,8 +1,18 @@
+import os
+import pytest
+import src.ingestion.reembed
+import src.retrieval.ann
+import src.retrieval.synonyms
 from sqlalchemy import text
 from src.db import get_session
 from src.models.document import Document
 from src.ingestion.store import ingest_document
-from src.retrieval.search import vector_search, fuzzy_search, synonym_vector_search, synonym_fuzzy_search
+from src.ingestion.embedding import embed_text
+from src.ingestion.reembed import backfill, cutover, status
+from src.ingestion.versioning import get_active_slot, cached_active_slot, standby_column
+from src.retrieval.ann import FlatIndex
+from src.retrieval.synonyms import CorpusVocabulary, get_vocabulary
+from src.retrieval.search import get_nlp, SearchHit, to_documents, vector_search, fuzzy_search, synonym_vector_search, synonym_fuzzy_search, _index_search, iter_synonym_search, synonym_expansion
 
 
 class TestSearch:
@@ -16,6 +26,9 @@ class TestSearch:
             ingest_document(session, "Vehicle", "Vehicles include cars, trucks and buses")
             ingest_document(session, "Fruit", "Fruit can be apples, bananas or oranges")
 
+            # Build the vocabulary now rather than in the background, so expansions are deterministic
+            get_vocabulary(session, get_nlp(), wait=True)
+
 
     def test_vector_search_empty(self):
         with get_session() as session:
@@ -29,7 +42,7 @@ class TestSearch:
 
     def test_vector_search(self):
         with get_session() as session:
-            results = vector_search(session, "fruit", limit=5)
+            results = to_documents(vector_search(session, "fruit", limit=5))
             assert len(results) > 0
             print(
                 "Vector Search:",
@@ -40,6 +53,126 @@ class TestSearch:
             assert isinstance(first_score, float)
 
 
+    def test_vector_search_hits(self):
+        with get_session() as session:
+            results = vector_search(session, "fruit", limit=5)
+            assert len(results) > 0
+            assert all(isinstance(hit, SearchHit) for hit in results)
+            assert results == sorted(results, key=lambda hit: hit.score, reverse=True)
+            assert results[0].to_document()[0].id == results[0].id
+
+
+    def test_vector_search_pagination(self):
+        with get_session() as session:
+            expected = vector_search(session, "fruit", limit=4)
+            first = vector_search(session, "fruit", limit=2)
+            second = vector_search(session, "fruit", limit=2, after=(first[-1].score, first[-1].id))
+            assert [hit.id for hit in first + second] == [hit.id for hit in expected]
+
+            # Snippets truncate content without changing the ranking
+            snippets = vector_search(session, "fruit", limit=4, snippet=5)
+            assert [hit.id for hit in snippets] == [hit.id for hit in expected]
+            assert all(len(hit.content) <= 5 for hit in snippets)
+
+
+    def test_vector_search_unembedded_rows(self):
+        with get_session() as session:
+            # A row written to the other slot after a cutover has no embedding in the slot still searched
+            session.execute(text(
+                "INSERT INTO documents (title, content) VALUES ('Pear', 'Pears are green fruits')"
+            ))
+            session.commit()
+            results = vector_search(session, "fruit", limit=10)
+            assert len(results) > 0
+            assert "Pear" not in [hit.title for hit in results]
+
+
+    def test_fuzzy_search_pagination(self):
+        with get_session() as session:
+            expected = fuzzy_search(session, "fruit", limit=4, threshold=0.0)
+            first = fuzzy_search(session, "fruit", limit=2, threshold=0.0)
+            second = fuzzy_search(
+                session, "fruit", limit=2, threshold=0.0, after=(first[-1].score, first[-1].id)
+            )
+            assert [hit.id for hit in first + second] == [hit.id for hit in expected]
+
+            # Every page picks up exactly where the previous one stopped
+            results = list(iter_synonym_search(
+                session, "fruit", method="fuzzy", limit=4, threshold=0.0, page_size=1, max_terms=0
+            ))
+            assert [hit.id for hit in results] == [hit.id for hit in expected]
+
+
+    def test_iter_synonym_search(self):
+        with get_session() as session:
+            expected = synonym_vector_search(session, "automobile", limit=4)
+            results = list(iter_synonym_search(session, "automobile", limit=4, page_size=1))
+            print("Streamed Synonym Search:", [(hit.title, round(hit.score, 4)) for hit in results])
+            assert [hit.id for hit in results] == [hit.id for hit in expected]
+
+
+    def test_synonym_search_pinned_pages(self):
+        with get_session() as session:
+            expected = synonym_vector_search(session, "automobile", limit=4)
+
+            # Later pages reuse the first page's expanded query and slot, as carried in the cursor
+            expanded = synonym_expansion(session, "automobile", threshold=0.3)
+            slot = cached_active_slot(session)
+            first = synonym_vector_search(session, "automobile", limit=2, query_expanded=expanded, slot=slot)
+            second = synonym_vector_search(
+                session, "automobile", limit=2, after=(first[-1].score, first[-1].id),
+                query_expanded=expanded, slot=slot
+            )
+            assert [hit.id for hit in first + second] == [hit.id for hit in expected]
+
+    def test_synonym_expansion_budget(self):
+        with get_session() as session:
+            expanded = synonym_expansion(session, "automobile", threshold=0.0, max_terms=3)
+            print("Expanded Query:", expanded)
+            terms = expanded.split()
+            assert terms[0] == "automobile"
+            assert 1 < len(terms) <= 4
+            assert len(set(terms)) == len(terms)
+            assert synonym_expansion(session, "automobile", threshold=0.0, max_terms=0) == "automobile"
+
+
+    def test_vocabulary_cold_start(self, monkeypatch):
+        with get_session() as session:
+            # A fresh process builds the vocabulary before expanding its first query
+            monkeypatch.setattr(src.retrieval.synonyms, "_VOCABULARY", None)
+            expanded = synonym_expansion(session, "automobile", threshold=0.0, max_terms=3)
+            assert len(expanded.split()) > 1
+
+
+    def test_vocabulary_refresh_versioning(self):
+        with get_session() as session:
+            vocabulary = CorpusVocabulary(get_nlp())
+            vocabulary.refresh(session)
+            before = vocabulary.snapshot
+            assert "truck" not in [term for term, _ in vocabulary.synonyms("lorry")]
+
+            # New rows publish a new snapshot and stale synonym lists are not served
+            ingest_document(session, "Truck", "A truck hauls cargo")
+            vocabulary.refresh(session)
+            assert vocabulary.snapshot.version == before.version + 1
+            assert len(vocabulary) == len(vocabulary.snapshot.vectors) > len(before.terms)
+            assert "truck" in [term for term, _ in vocabulary.synonyms("lorry")]
+
+            # The previous snapshot is left untouched for expansions still reading it
+            assert len(before.terms) == len(before.vectors)
+            assert "truck" not in before.positions
+
+            # A re-upload reusing the same ids replaces the terms of the deleted documents
+            session.execute(text("TRUNCATE TABLE documents RESTART IDENTITY CASCADE;"))
+            session.commit()
+            for title in ("Piano", "Violin", "Guitar", "Drum", "Flute", "Harp"):
+                ingest_document(session, title, f"The {title.lower()} is a musical instrument")
+            vocabulary.refresh(session)
+            assert "truck" not in vocabulary.snapshot.positions
+            assert "piano" in vocabulary.snapshot.positions
+            assert "truck" not in [term for term, _ in vocabulary.synonyms("lorry")]
+
+
     def test_fuzzy_search_empty(self):
         with get_session() as session:
             results = fuzzy_search(session, "")
@@ -53,7 +186,7 @@ class TestSearch:
     def test_fuzzy_search(self):
         with get_session() as session:
             # session.execute(text("SET pg_bigm.similarity_threshold = 0.2;"))
-            results = fuzzy_search(session, "fruit", limit=5)
+            results = to_documents(fuzzy_search(session, "fruit", limit=5))
             assert len(results) > 0
             print("Fuzzy Search:", [(doc.title, round(score, 4)) for doc, score in results])
             first_doc, first_score = results[0]
@@ -63,7 +196,7 @@ class TestSearch:
 
     def test_synonym_vector_search(self):
         with get_session() as session:
-            results = synonym_vector_search(session, "automobile", limit=5)
+            results = to_documents(synonym_vector_search(session, "automobile", limit=5))
             assert len(results) > 0
             print("Synonym Vector Search:", [(doc.title, round(score, 4)) for doc, score in results])
             first_doc, first_score = results[0]
@@ -73,9 +206,167 @@ class TestSearch:
 
     def test_synonym_fuzzy_search(self):
         with get_session() as session:
-            results = synonym_fuzzy_search(session, "automobile", limit=5)
+            results = to_documents(synonym_fuzzy_search(session, "automobile", limit=5))
             assert len(results) > 0
             print("Synonym Fuzzy Search:", [(doc.title, round(score, 4)) for doc, score in results])
             first_doc, first_score = results[0]
             assert isinstance(first_doc, Document)
             assert isinstance(first_score, float)
+
+
+    def test_ann_index_search(self, tmp_path):
+        with get_session() as session:
+            index = FlatIndex(str(tmp_path))
+            index.build(session)
+            assert len(index) == 5
+
+            # Snapshot reloads memory-mapped with the same contents
+            reloaded = FlatIndex(str(tmp_path))
+            assert reloaded.load()
+            assert len(reloaded) == 5
+
+            # Rebuilding publishes a new snapshot directory and prunes the old one
+            index.build(session)
+            assert reloaded.load() and len(reloaded) == 5
+            assert len([entry for entry in os.listdir(tmp_path) if entry.startswith("snap-")]) == 1
+
+            expected = vector_search(session, "fruit", limit=3)
+            results = _index_search(session, reloaded, embed_text("fruit"), 3)
+            print("ANN Index Search:", [(hit.title, round(hit.score, 4)) for hit in results])
+            assert [(hit.id, hit.score) for hit in results] == [(hit.id, hit.score) for hit in expected]
+
+
+    def test_ann_index_duplicate_paging(self, tmp_path):
+        with get_session() as session:
+            # Duplicate documents share an embedding, so their scores tie
+            for _ in range(6):
+                ingest_document(session, "Apple", "Apples are red fruits")
+            index = FlatIndex(str(tmp_path))
+            index.build(session)
+            query = embed_text("fruit")
+
+            # Ties across a page boundary are broken by id, so no row is skipped or repeated
+            seen, after = [], None
+            while page := index.search(query, 2, after=after):
+                seen.extend(doc_id for doc_id, _ in page)
+                after = (page[-1][1], page[-1][0])
+            assert sorted(seen) == list(range(1, 12))
+
+            # Pages alternating between the index and pgvector continue each other's cursors
+            expected = vector_search(session, "fruit", limit=11)
+            results, after = [], None
+            for page in range(6):
+                if page % 2 == 0:
+                    hits = _index_search(session, index, query, 2, after=after)
+                else:
+                    hits = vector_search(session, "fruit", limit=2, after=after)
+                if not hits:
+                    break
+                results.extend(hits)
+                after = (hits[-1].score, hits[-1].id)
+            assert [(hit.id, hit.score) for hit in results] == [(hit.id, hit.score) for hit in expected]
+
+
+    def test_ann_index_reupload(self, tmp_path):
+        with get_session() as session:
+            index = FlatIndex(str(tmp_path))
+            index.build(session)
+            generation = index.snapshot.generation
+
+            # Replace the corpus with as many different rows, reusing ids 1 to 5
+            session.execute(text("TRUNCATE TABLE documents RESTART IDENTITY CASCADE;"))
+            session.commit()
+            ingest_document(session, "Train", "Trains run on rails")
+            ingest_document(session, "Boat", "Boats sail across the sea")
+            ingest_document(session, "Piano", "Pianos have black and white keys")
+            ingest_document(session, "Mango", "Mangoes are tropical fruits")
+            ingest_document(session, "Violin", "Violins are string instruments")
+
+            # The truncation is detected although row count and max id are unchanged
+            index.refresh(session)
+            assert index.snapshot.generation != generation
+            assert len(index) == 5
+            expected = vector_search(session, "fruit", limit=3)
+            results = _index_search(session, index, embed_text("fruit"), 3)
+            assert [(hit.id, hit.score) for hit in results] == [(hit.id, hit.score) for hit in expected]
+
+
+    def test_ann_index_reupload_search(self, tmp_path, monkeypatch):
+        with get_session() as session:
+            index = FlatIndex(str(tmp_path))
+            index.build(session)
+            generation = index.snapshot.generation
+
+            # Serve searches from this snapshot, with no refresh due for a long time
+            monkeypatch.setattr(src.retrieval.ann, "ANN_INDEX_DIR", str(tmp_path))
+            monkeypatch.setattr(src.retrieval.ann, "ANN_REFRESH_SECONDS", 3600.0)
+            monkeypatch.setattr(src.retrieval.ann, "_INDEX", index)
+            monkeypatch.setattr(src.retrieval.ann, "_REFRESH_THREAD", None)
+
+            # Replace the corpus, reusing ids 1 to 5 for unrelated rows
+            session.execute(text("TRUNCATE TABLE documents RESTART IDENTITY CASCADE;"))
+            session.commit()
+            ingest_document(session, "Train", "Trains run on rails")
+            ingest_document(session, "Boat", "Boats sail across the sea")
+            ingest_document(session, "Piano", "Pianos have black and white keys")
+            ingest_document(session, "Mango", "Mangoes are tropical fruits")
+            ingest_document(session, "Violin", "Violins are string instruments")
+            with monkeypatch.context() as m:
+                m.setattr(src.retrieval.ann, "ANN_INDEX_DIR", None)
+                expected = vector_search(session, "fruit", limit=3)
+
+            # The outdated snapshot is not trusted: search falls back to pgvector and a refresh starts
+            assert src.retrieval.ann.get_index(session) is index
+            results = vector_search(session, "fruit", limit=3)
+            assert [(hit.id, hit.title) for hit in results] == [(hit.id, hit.title) for hit in expected]
+            src.retrieval.ann._REFRESH_THREAD.join()
+            assert index.snapshot.generation != generation
+
+            # The refreshed snapshot serves searches again
+            results = _index_search(session, index, embed_text("fruit"), 3)
+            assert [(hit.id, hit.score) for hit in results] == [(hit.id, hit.score) for hit in expected]
+
+
+    def test_reembed_cutover(self, tmp_path, monkeypatch):
+        with get_session() as session:
+            active = get_active_slot(session)
+            index = FlatIndex(str(tmp_path))
+            index.build(session)
+        standby = standby_column(active.column)
+
+        try:
+            # Backfill the standby slot with the same model, reporting progress per batch
+            reported = []
+            assert backfill(active.model, batch_size=2, progress=lambda total, column: reported.append((total, column))) == 5
+            assert reported == [(2, standby), (4, standby), (5, standby)]
+            report = status()
+            print("Re-embedding Status:", report)
+            assert report["standby_column"] == standby
+            assert report["standby_models"] == {active.model: 5}
+            assert report["standby_index_valid"] is True
+
+            # Refuse to cut over while more rows than allowed would be embedded under the lock
+            with get_session() as session:
+                ingest_document(session, "Orange", "Oranges are citrus fruits")
+                expected = vector_search(session, "fruit", limit=3)
+            with monkeypatch.context() as m:
+                m.setattr(src.ingestion.reembed, "_catch_up", lambda *args, **kwargs: 0)
+                with pytest.raises(RuntimeError):
+                    cutover(active.model, max_catch_up=0)
+            assert status()["active_column"] == active.column
+
+            # Cut over, catching up the new row before locking; search and the index follow the new slot
+            assert cutover(active.model, max_catch_up=0) == standby
+            with get_session() as session:
+                slot = cached_active_slot(session)
+                assert (slot.column, slot.model) == (standby, active.model)
+                results = vector_search(session, "fruit", limit=3)
+                assert [hit.id for hit in results] == [hit.id for hit in expected]
+
+                index.refresh(session, slot)
+                assert index.column == standby
+                assert len(index) == 6
+        finally:
+            # Cut back over to the original slot
+            backfill(active.model)
+            cutover(active.model)